@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules repo root pe hain (package nahi) - tests unhe seedha import karte hain
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from wa_deadlines import ALL, KEEP_SAMPLES, StepHistory, instance_scope, percentile
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.delenv("WA_DEADLINES", raising=False)
+    return StepHistory(str(tmp_path / "step_history.json"))
+
+
+def test_percentile_interpolates():
+    assert percentile([], 0.95) is None
+    assert percentile([5], 0.95) == 5
+    assert percentile([1, 2, 3, 4, 5], 0.5) == 3
+    assert percentile([10, 0], 0.25) == 2.5
+
+
+def test_too_few_samples_keep_default(history):
+    for _ in range(4):
+        history.record("web_code", 10)
+    assert history.deadline("web_code", 45) == 45
+
+
+def test_deadline_from_p95_with_margin(history):
+    for s in (10, 10, 10, 10, 20):
+        history.record("web_code", s)
+    # p95 = 18 -> 18 * 1.5
+    assert history.deadline("web_code", 45) == 27.0
+
+
+def test_deadline_floor_and_cap(history):
+    for _ in range(5):
+        history.record("web_code", 1)
+        history.record("login", 500)
+        history.record("click:menu", 0.5)
+    assert history.deadline("web_code", 45) == 15      # FLOORS["web_code"]
+    assert history.deadline("login", 300) == 600       # 2x default
+    assert history.deadline("click:menu", 8) == 3      # "click" prefix floor
+
+
+def test_recent_timeout_falls_back_to_default(history):
+    for _ in range(10):
+        history.record("web_code", 10)
+    history.record("web_code", None)
+    assert history.deadline("web_code", 45) == 45
+    for _ in range(3):
+        history.record("web_code", 10)
+    assert history.deadline("web_code", 45) == 15
+
+
+def test_fixed_mode(history, monkeypatch):
+    for _ in range(5):
+        history.record("web_code", 10)
+    monkeypatch.setenv("WA_DEADLINES", "fixed")
+    assert history.deadline("web_code", 45) == 45
+
+
+def test_scope_uses_own_samples_once_enough(history):
+    for _ in range(5):
+        history.record("login", 100, scope="A")
+    for _ in range(4):
+        history.record("login", 20, scope="B")
+    # B ke paas kam samples - global (A + B) pe chalta hai
+    assert history.samples("login", "B") == history.samples("login")
+    assert history.deadline("login", 300, "A") == 150
+    history.record("login", 20, scope="B")
+    assert history.deadline("login", 300, "B") == 60
+
+
+def test_samples_are_trimmed_and_saved(history):
+    for i in range(KEEP_SAMPLES + 10):
+        history.record("chooser", i)
+    history.save()
+    with open(history.path, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert len(saved["chooser"][ALL]) == KEEP_SAMPLES
+    assert StepHistory(history.path).samples("chooser")[-1] == KEEP_SAMPLES + 9
+
+
+def test_instance_scope():
+    class Device:
+        serial = "R58M123ABC"
+
+    assert instance_scope(Device()) == "R58M123ABC"
+    assert instance_scope(Device(), "com.whatsapp", 10) == "R58M123ABC/com.whatsapp:10"
+    assert instance_scope(object()) == "default"
+
+
+class _Selector:
+    def exists(self, timeout=0):
+        return True
+
+    def click(self):
+        pass
+
+
+class _Device:
+    serial = "deadline-test"
+
+    def __call__(self, **kwargs):
+        return _Selector()
+
+
+class _Cache:
+    def get(self, scope, step):
+        return {"kind": "res", "value": "com.whatsapp:id/menuitem_overflow"}
+
+
+def test_learned_selector_hit_not_recorded(monkeypatch):
+    import wa_android
+
+    recorded = []
+    monkeypatch.setattr(wa_android, "selector_scope", lambda device, package: "scope")
+    monkeypatch.setattr(wa_android, "deadline", lambda step, default, scope=None: default)
+    monkeypatch.setattr(wa_android, "record_step", lambda *a: recorded.append(a))
+    assert wa_android.smart_click(_Device(), ["menu"], package="com.whatsapp", step="menu", cache=_Cache())
+    assert recorded == []  # learned-id ka fast hit discovery deadline ko chhota na kare
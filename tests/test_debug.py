@@ -0,0 +1,33 @@
+import os
+import time
+
+from wa_debug import DebugArtifacts
+
+
+def make_run(profile_dir, name, age):
+    path = profile_dir / name
+    path.mkdir(parents=True)
+    then = time.time() - age
+    os.utime(path, (then, then))
+    return path
+
+
+def test_rotation_keeps_recent_and_active_runs(tmp_path):
+    profile_dir = tmp_path / "C1_M1"
+    old = [make_run(profile_dir, f"20260101-0000{i:02d}-100", age=3600) for i in range(4)]
+    busy = make_run(profile_dir, "20260101-000100-200", age=30)  # dusre process ka chalta session
+
+    other = DebugArtifacts("C1_M1", level="always", root=str(tmp_path), keep_runs=1, run_tag="job-a")
+    other.save_text("a", "x")
+    other.flush()
+    os.utime(other.run_dir, (time.time() - 3600,) * 2)  # purani dikhe, par abhi open hai
+
+    current = DebugArtifacts("C1_M1", level="always", root=str(tmp_path), keep_runs=1, run_tag="job-b")
+    current.save_text("b", "y")
+    current.flush()
+
+    left = set(os.listdir(profile_dir))
+    assert not any(p.name in left for p in old)
+    assert {busy.name, os.path.basename(other.run_dir), os.path.basename(current.run_dir)} <= left
+    other.close()
+    current.close()
@@ -0,0 +1,64 @@
+from wa_android import fast_click, point_step
+
+
+class Selector:
+    def __init__(self, device):
+        self.device = device
+
+    def exists(self, timeout=0):
+        return self.device.visible
+
+    def click(self):
+        self.device.clicks.append("id")
+
+
+class Device:
+    serial = "fast-click-test"
+
+    def __init__(self, visible):
+        self.visible = visible
+        self.clicks = []
+
+    def __call__(self, **kwargs):
+        return Selector(self)
+
+    def window_size(self):
+        return 1080, 2400
+
+    def click(self, x, y):
+        self.clicks.append((x, y))
+
+
+class Cache:
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get(self, scope, step):
+        return self.entries.get(step)
+
+
+XY = {point_step("menu", "1080x2400"): {"kind": "xy", "value": [1000, 150]}}
+ID = {"menu": {"kind": "res", "value": "com.whatsapp:id/menuitem_overflow"}}
+
+
+def fast(device, cache, monkeypatch):
+    monkeypatch.setattr("wa_android.selector_scope", lambda device, package: "scope")
+    return fast_click(device, "com.whatsapp", "menu", cache=cache, timeout=0)
+
+
+def test_learned_id_clicked(monkeypatch):
+    d = Device(visible=True)
+    assert fast(d, Cache({**ID, **XY}), monkeypatch) == "id"
+    assert d.clicks == ["id"]
+
+
+def test_missing_learned_id_never_taps_coordinates(monkeypatch):
+    d = Device(visible=False)
+    assert fast(d, Cache({**ID, **XY}), monkeypatch) is None
+    assert d.clicks == []
+
+
+def test_coordinates_only_without_learned_id(monkeypatch):
+    d = Device(visible=False)
+    assert fast(d, Cache(XY), monkeypatch) == "xy"
+    assert d.clicks == [(1000, 150)]
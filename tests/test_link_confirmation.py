@@ -0,0 +1,65 @@
+from wa_android import forget_linked_devices, phone_link_confirmed, remember_linked_devices
+
+
+class Selector:
+    def __init__(self, device, kwargs):
+        self.device, self.kwargs = device, kwargs
+
+    @property
+    def exists(self):
+        if self.kwargs.get("className") == "android.widget.EditText":
+            return self.device.code_screen
+        return "link a device" in self.kwargs.get("textMatches", "")
+
+    @property
+    def count(self):
+        return self.device.rows
+
+
+class Device:
+    """Linked devices screen ka chhota fake (sirf selector queries)."""
+
+    serial = "R58M123ABC"
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.code_screen = False
+
+    def __call__(self, **kwargs):
+        return Selector(self, kwargs)
+
+
+class Cache:
+    def get(self, scope, step):
+        return None
+
+
+def test_needs_new_row_for_same_user():
+    d = Device(rows=2)
+    remember_linked_devices(d, "com.whatsapp", 0)
+    assert not phone_link_confirmed(d, "com.whatsapp", Cache(), user_id=0)  # back / rejected code
+    d.rows = 3
+    assert phone_link_confirmed(d, "com.whatsapp", Cache(), user_id=0)
+    assert not phone_link_confirmed(d, "com.whatsapp", Cache(), user_id=0)  # baseline ab 3
+    forget_linked_devices(d, "com.whatsapp", 0)
+
+
+def test_baseline_is_per_user():
+    d = Device(rows=1)
+    remember_linked_devices(d, "com.whatsapp", 0)
+    d.rows = 2
+    # user 999 ka baseline kabhi record nahi hua - user 0 ki row se confirm nahi
+    assert not phone_link_confirmed(d, "com.whatsapp", Cache(), user_id=999)
+    remember_linked_devices(d, "com.whatsapp", 999)
+    assert not phone_link_confirmed(d, "com.whatsapp", Cache(), user_id=999)
+    assert phone_link_confirmed(d, "com.whatsapp", Cache(), user_id=0)
+    forget_linked_devices(d, "com.whatsapp", 0)
+    forget_linked_devices(d, "com.whatsapp", 999)
+
+
+def test_still_on_code_screen():
+    d = Device(rows=1)
+    remember_linked_devices(d, "com.whatsapp", 0)
+    d.rows, d.code_screen = 2, True
+    assert not phone_link_confirmed(d, "com.whatsapp", Cache(), user_id=0)
+    forget_linked_devices(d, "com.whatsapp", 0)
@@ -0,0 +1,66 @@
+import pytest
+
+import wa_manifest
+from wa_manifest import ManifestError, load_manifest
+
+
+@pytest.fixture(autouse=True)
+def fake_devices(monkeypatch):
+    monkeypatch.delenv("WA_DEFAULT_COUNTRY_CODE", raising=False)
+    monkeypatch.setattr(wa_manifest, "healthy_devices", lambda: ["R58M123ABC"])
+    monkeypatch.setattr(wa_manifest, "find_whatsapp_instances",
+                        lambda serial: [("com.whatsapp", 0), ("com.whatsapp", 10)])
+
+
+def write(tmp_path, text, name="manifest.csv"):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_valid_csv(tmp_path):
+    path = write(tmp_path, "profile,phone,serial,instance,timeout,launch_mode,debug\n"
+                           "C1_M1,919876543210,R58M123ABC,2,300,WARM,on-failure\n"
+                           "CR5_R1,+14155552671,,,,,\n")
+    first, second = load_manifest(path)
+    assert first == {"profile": "C1_M1", "phone": "+919876543210", "serial": "R58M123ABC",
+                     "instance": 2, "timeout": 300, "launch_mode": "warm", "debug": "on-failure",
+                     "line": 2}
+    assert second["serial"] is None and second["instance"] == 1 and second["timeout"] is None
+
+
+def test_all_errors_reported_at_once(tmp_path):
+    path = write(tmp_path, "profile,phone,serial,instance,colour\n"
+                           "C1_M1,919876543210,,1,\n"
+                           "C1_M1,+91 98765 43210,,1,\n"
+                           "bad,12,OTHER,x,red\n"
+                           "C2_M1,+14155552671,R58M123ABC,3,\n")
+    with pytest.raises(ManifestError) as exc:
+        load_manifest(path)
+    errors = exc.value.errors
+    assert "line 3: profile C1_M1 already listed at line 2" in errors
+    assert "line 3: phone +919876543210 already listed at line 2" in errors
+    assert "line 4: unknown column(s) colour" in errors
+    assert any(e.startswith("line 4: invalid profile code 'bad'") for e in errors)
+    assert any(e.startswith("line 4: invalid or missing phone") for e in errors)
+    assert any(e.startswith("line 4: instance must be a positive number") for e in errors)
+    assert "line 4: device OTHER not connected / not healthy" in errors
+    assert "line 5: instance 3 not available on R58M123ABC (2 found)" in errors
+
+
+def test_empty_manifest(tmp_path):
+    with pytest.raises(ManifestError) as exc:
+        load_manifest(write(tmp_path, "profile,phone\n"))
+    assert exc.value.errors == ["manifest has no profiles"]
+
+
+def test_yaml_defaults(tmp_path):
+    pytest.importorskip("yaml")
+    path = write(tmp_path, "defaults: {instance: 2, launch_mode: cold}\n"
+                           "profiles:\n"
+                           "  - {profile: C1_M1, phone: \"919876543210\"}\n"
+                           "  - {profile: C1_M2, phone: \"+14155552671\", instance: 1}\n",
+                 name="manifest.yaml")
+    first, second = load_manifest(path)
+    assert (first["instance"], first["launch_mode"], first["line"]) == (2, "cold", 1)
+    assert second["instance"] == 1
@@ -0,0 +1,29 @@
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+from wa_memory import browser_tree_rss
+
+
+@pytest.fixture
+def tagged_process():
+    tag = f"--wa-session-tag={uuid.uuid4().hex[:12]}"
+    proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)", tag])
+    yield proc, tag
+    proc.kill()
+    proc.wait()
+
+
+def test_tree_found_by_tag_switch(tagged_process):
+    proc, tag = tagged_process
+    pid, rss, count = browser_tree_rss(None, marker=tag)
+    if rss is None:
+        pytest.skip("no psutil and no /proc on this OS")
+    assert pid == proc.pid and rss > 0 and count >= 1
+
+
+def test_nothing_to_measure():
+    assert browser_tree_rss(None) == (None, None, 0)
+    assert browser_tree_rss(None, marker=f"--wa-session-tag={uuid.uuid4().hex}") == (None, None, 0)
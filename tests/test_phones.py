@@ -0,0 +1,79 @@
+import os
+import time
+
+import pytest
+
+from wa_phones import PhoneIndex, country_code_of, iter_phone_records, normalize_e164
+
+
+@pytest.fixture(autouse=True)
+def no_default_cc(monkeypatch):
+    monkeypatch.delenv("WA_DEFAULT_COUNTRY_CODE", raising=False)
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("+91 98765-43210", "+919876543210"),
+    ("0091 98765 43210", "+919876543210"),
+    ("919876543210", "+919876543210"),
+    ("+1 (415) 555-2671", "+14155552671"),
+    ("+44 20 7946 0958", "+442079460958"),
+    ("phone: +971 50 123 4567 (office)", "+971501234567"),
+])
+def test_normalize_e164_valid(raw, expected):
+    assert normalize_e164(raw) == expected
+
+
+@pytest.mark.parametrize("raw", [
+    None, "", "abc", "12345",
+    "+0 123456789",          # no country code 0
+    "+999 1234567",          # unassigned code
+    "+91 1234567890123456",  # longer than 15 digits
+])
+def test_normalize_e164_invalid(raw):
+    assert normalize_e164(raw) is None
+
+
+def test_national_number_needs_default_cc(monkeypatch):
+    assert normalize_e164("09876543210") is None
+    assert normalize_e164("09876543210", default_cc="91") == "+919876543210"
+    monkeypatch.setenv("WA_DEFAULT_COUNTRY_CODE", "+91")
+    assert normalize_e164("98765 43210") == "+919876543210"
+
+
+def test_country_code_of_first_prefix_match():
+    assert country_code_of("14155552671") == "1"
+    assert country_code_of("919876543210") == "91"
+    assert country_code_of("971501234567") == "971"
+    assert country_code_of("0123") is None
+
+
+def test_iter_phone_records_csv_dedupes_and_maps_columns(tmp_path):
+    path = tmp_path / "phones.csv"
+    path.write_text("instance,number,profile\n"
+                    "2,+91 98765 43210,C1_M1\n"
+                    ",919876543210,C1_M2\n"
+                    "1,not a number,C1_M3\n"
+                    "1,+14155552671,\n", encoding="utf-8")
+    records = list(iter_phone_records(str(path)))
+    assert [r["number"] for r in records] == ["+919876543210", "+14155552671"]
+    assert records[0]["profile"] == "C1_M1" and records[0]["instance"] == 2
+    assert records[1]["profile"] is None and records[1]["instance"] == 1
+
+
+def test_index_keeps_used_numbers_after_file_change(tmp_path):
+    path = tmp_path / "phones.txt"
+    path.write_text("+919876543210\n+14155552671\n", encoding="utf-8")
+    index = PhoneIndex(str(path))
+    assert index.next_unused()["number"] == "+919876543210"
+    index.mark_used("+919876543210")
+    index.close()
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("+442079460958\n")
+    os.utime(path, (time.time() + 5, time.time() + 5))  # same-second mtime pe bhi stale dikhe
+
+    index = PhoneIndex(str(path))
+    assert index.count() == 3
+    assert index.find("+919876543210")["used"]
+    assert index.next_unused()["number"] == "+14155552671"
+    index.close()
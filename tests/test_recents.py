@@ -0,0 +1,35 @@
+from wa_android import recent_task_packages
+
+RECENTS = """
+  * Recent #0: Task{8c1f2d0 #412 type=standard A=10231:com.whatsapp U=999 StackId=18 visible=false sz=1}
+  * Recent #1: Task{31a9b4e #398 type=standard A=10231:com.whatsapp U=0 StackId=12 visible=true sz=1}
+  * Recent #2: Task{0b7e6aa #2 type=home A=10066:com.android.launcher3 U=0 StackId=1 sz=1}
+  * Recent #3: Task{77f0c11 #401 type=standard A=10231:com.whatsapp U=0 StackId=12 sz=1}
+"""
+
+
+class Result:
+    def __init__(self, output):
+        self.output = output
+
+
+class Device:
+    def __init__(self, output):
+        self.out = output
+
+    def shell(self, cmd):
+        return Result(self.out)
+
+
+def test_tasks_keep_user():
+    assert recent_task_packages(Device(RECENTS)) == [("com.whatsapp", 999), ("com.whatsapp", 0)]
+
+
+def test_old_format_without_affinity_uid():
+    out = "* Recent #0: Task{1 #5 A=com.whatsapp U=0 sz=1}\n"
+    assert recent_task_packages(Device(out)) == [("com.whatsapp", 0)]
+
+
+def test_unparsed_output_is_unknown():
+    assert recent_task_packages(Device("")) is None
+    assert recent_task_packages(Device("Recent tasks:\n  (nothing we understand)\n")) is None
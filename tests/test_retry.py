@@ -0,0 +1,126 @@
+import pytest
+
+import wa_retry
+from wa_retry import CircuitBreaker, CircuitOpenError, RetryPolicy, retry
+
+NO_WAIT = RetryPolicy(attempts=3, base=0)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(wa_retry, "time", c)
+    return c
+
+
+def test_policy_delay_is_capped_with_jitter():
+    policy = RetryPolicy(base=1, cap=4)
+    for attempt in range(6):
+        d = min(4, 2 ** attempt)
+        assert d / 2 <= policy.delay(attempt) <= d
+
+
+def test_retry_until_success(clock):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) < 3:
+            raise OSError("flaky")
+        return "ok"
+
+    retried = []
+    assert retry(fn, NO_WAIT, on_retry=retried.append) == "ok"
+    assert len(calls) == 3 and retried == [1, 2]
+
+
+def test_retry_reraises_last_error(clock):
+    def fn():
+        raise OSError("down")
+
+    with pytest.raises(OSError):
+        retry(fn, NO_WAIT)
+
+
+def test_retry_only_on_listed_errors(clock):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise KeyError("no retry")
+
+    with pytest.raises(KeyError):
+        retry(fn, NO_WAIT, retry_on=(OSError,))
+    assert len(calls) == 1
+
+
+def test_rejected_result_is_returned_after_last_attempt(clock):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return False
+
+    assert retry(fn, NO_WAIT, accept=bool) is False
+    assert len(calls) == 3
+
+
+def test_breaker_counts_one_outcome_per_call(clock):
+    breaker = CircuitBreaker("test:calls", threshold=2, cooldown=60)
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        raise OSError("down")
+
+    with pytest.raises(OSError):
+        retry(fn, NO_WAIT, breaker=breaker)
+    assert breaker.state == "closed" and breaker.failures == 1
+    with pytest.raises(OSError):
+        retry(fn, NO_WAIT, breaker=breaker)
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        retry(fn, NO_WAIT, breaker=breaker)
+    assert len(attempts) == 6  # open circuit: fn nahi chala
+
+
+def test_breaker_half_open_trial(clock):
+    breaker = CircuitBreaker("test:half-open", threshold=1, cooldown=60)
+    breaker.failure()
+    assert breaker.is_open() and not breaker.allow()
+
+    clock.now += 61
+    assert not breaker.is_open()
+    assert breaker.allow()       # single trial
+    assert not breaker.allow()   # baaki wait karein
+    breaker.failure()            # trial fail -> phir open
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now += 61
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.failures == 0 and breaker.allow()
+
+
+def test_stuck_trial_expires_after_cooldown(clock):
+    breaker = CircuitBreaker("test:stuck", threshold=1, cooldown=60)
+    breaker.failure()
+    clock.now += 61
+    assert breaker.allow()
+    # trial ka result kabhi record nahi hua (crash)
+    clock.now += 30
+    assert not breaker.allow()
+    clock.now += 31
+    assert breaker.allow()
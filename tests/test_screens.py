@@ -0,0 +1,103 @@
+import pytest
+
+from wa_screens import (
+    SCREEN_CHATS,
+    SCREEN_CHOOSER,
+    SCREEN_HOME,
+    SCREEN_LINKED_DEVICES,
+    SCREEN_LOCK,
+    SCREEN_MENU,
+    SCREEN_PHONE_CODE,
+    SCREEN_QR_SCANNER,
+    SCREEN_WHATSAPP_OTHER,
+    TRANSITIONS,
+    plan_path,
+)
+
+LINK_STEPS = ["menu", "linked_devices", "link_device", "link_with_phone"]
+
+
+@pytest.mark.parametrize("screen, expected", [
+    (SCREEN_PHONE_CODE, []),
+    (SCREEN_QR_SCANNER, ["link_with_phone"]),
+    (SCREEN_LINKED_DEVICES, ["link_device", "link_with_phone"]),
+    (SCREEN_MENU, LINK_STEPS[1:]),
+    (SCREEN_CHATS, LINK_STEPS),
+    (SCREEN_HOME, ["launch"] + LINK_STEPS),
+    (SCREEN_CHOOSER, ["choose"] + LINK_STEPS),
+    (SCREEN_LOCK, ["unlock", "launch"] + LINK_STEPS),
+    (SCREEN_WHATSAPP_OTHER, ["back"] + LINK_STEPS),
+])
+def test_plan_path_to_code_entry(screen, expected):
+    assert plan_path(screen) == expected
+
+
+def test_plan_path_other_targets():
+    assert plan_path(SCREEN_HOME, target=SCREEN_CHATS) == ["launch"]
+    assert plan_path(SCREEN_PHONE_CODE, target=SCREEN_CHATS) is None  # koi transition nahi
+    assert plan_path("unknown_screen") is None
+
+
+def test_every_screen_reaches_code_entry():
+    for screen in TRANSITIONS:
+        assert plan_path(screen) is not None, screen
+
+
+class _Nav:
+    """classify_screen / _perform ka fake: har action ke baad agla screen."""
+
+    def __init__(self, screens, baseline=None):
+        self.screens = list(screens)
+        self.actions = []
+        self.baseline = baseline
+
+    def classify(self, device, package, user_id=None, cache=None):
+        return self.screens[0], []
+
+    def perform(self, device, package, user_id, action, cache):
+        self.actions.append(action)
+        if len(self.screens) > 1:
+            self.screens.pop(0)
+        if action == "link_device":
+            self.baseline = 1
+        return True
+
+
+@pytest.fixture
+def nav(monkeypatch):
+    import wa_screens
+
+    def install(screens, baseline=None):
+        n = _Nav(screens, baseline)
+        monkeypatch.setattr(wa_screens, "classify_screen", n.classify)
+        monkeypatch.setattr(wa_screens, "_perform", n.perform)
+        monkeypatch.setattr(wa_screens, "forget_linked_devices", lambda *a: None)
+        monkeypatch.setattr(wa_screens, "linked_devices_baseline", lambda *a: n.baseline)
+        return n
+    return install
+
+
+def test_reach_from_chats(nav):
+    from wa_screens import reach_phone_code_screen
+
+    n = nav([SCREEN_CHATS, SCREEN_MENU, SCREEN_LINKED_DEVICES, SCREEN_QR_SCANNER, SCREEN_PHONE_CODE])
+    assert reach_phone_code_screen(None, "com.whatsapp", 0, cache=object()) is None
+    assert n.actions == LINK_STEPS
+
+
+def test_stale_code_screen_is_left(nav):
+    from wa_screens import reach_phone_code_screen
+
+    n = nav([SCREEN_PHONE_CODE, SCREEN_QR_SCANNER, SCREEN_LINKED_DEVICES, SCREEN_QR_SCANNER, SCREEN_PHONE_CODE])
+    assert reach_phone_code_screen(None, "com.whatsapp", 0, cache=object()) is None
+    # stale screen -> back, QR bina baseline -> back, phir fresh navigation
+    assert n.actions == ["back", "back", "link_device", "link_with_phone"]
+
+
+def test_stuck_returns_screen_name(nav):
+    from wa_screens import reach_phone_code_screen, stuck_message
+
+    nav([SCREEN_WHATSAPP_OTHER])
+    stuck = reach_phone_code_screen(None, "com.whatsapp", 0, cache=object(), max_actions=5)
+    assert stuck == SCREEN_WHATSAPP_OTHER
+    assert stuck_message(stuck) == "Code entry screen not reached (stuck on whatsapp_other)"
@@ -0,0 +1,75 @@
+from wa_web import IpcStats, click_link_with_phone, find_phone_input
+
+
+class Locator:
+    def __init__(self, page, key):
+        self.page, self.key = page, key
+
+    @property
+    def first(self):
+        return self
+
+    def count(self):
+        return 1 if self.key in self.page.legacy else 0
+
+    def all(self):
+        return [self]
+
+    def click(self, timeout=None):
+        if self.key.startswith("[data-wa-discover") and self.page.stale:
+            raise TimeoutError(f"Timeout {timeout}ms exceeded")
+        self.page.clicked.append(self.key)
+
+    def wait_for(self, state=None, timeout=None):
+        if self.page.stale:
+            raise TimeoutError(f"Timeout {timeout}ms exceeded")
+
+    def scroll_into_view_if_needed(self):
+        pass
+
+    def is_visible(self):
+        return True
+
+
+class Page:
+    """Discovery ne node tag kiya par woh stale / hidden hai."""
+
+    def __init__(self, stale, legacy=()):
+        self.stale = stale
+        self.legacy = set(legacy)
+        self.clicked = []
+
+    def evaluate(self, js, args):
+        out = {"hidden": []}
+        if args.get("texts"):
+            out["link"] = {"text": args["texts"][0], "visible": True}
+        if args.get("selectors"):
+            out["input"] = {"selector": args["selectors"][0], "count": 1, "visible": True}
+        return out
+
+    def locator(self, sel):
+        return Locator(self, sel)
+
+    def get_by_text(self, txt, exact=False):
+        return Locator(self, txt)
+
+
+def test_link_click_uses_discovered_node(monkeypatch):
+    monkeypatch.setattr("wa_web.time.sleep", lambda s: None)
+    page = Page(stale=False)
+    assert click_link_with_phone(page, ["Link with phone number"], IpcStats("js")) == "Link with phone number"
+    assert page.clicked == ["[data-wa-discover='link']"]
+
+
+def test_stale_link_falls_back_to_locators(monkeypatch):
+    monkeypatch.setattr("wa_web.time.sleep", lambda s: None)
+    page = Page(stale=True, legacy=["Link with phone"])
+    assert click_link_with_phone(page, ["Link with phone number", "Link with phone"],
+                                 IpcStats("js")) == "Link with phone"
+    assert page.clicked == ["Link with phone"]
+
+
+def test_stale_input_falls_back_to_selector_chain():
+    page = Page(stale=True, legacy=["input[type='tel']"])
+    locator, sel = find_phone_input(page, ["input[type='text']", "input[type='tel']"], IpcStats("js"))
+    assert sel == "input[type='tel']" and locator.key == sel
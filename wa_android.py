@@ -0,0 +1,970 @@
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+
+from wa_deadlines import deadline, instance_scope, record_step
+from wa_metrics import HIERARCHY_DUMP_SECONDS
+from wa_retry import RetryPolicy, retry
+from wa_selector_cache import android_scope, device_scope, get_selector_cache
+
+# Shared Android (uiautomator2) helpers for WA_Login_Automator.py and wa_phone_pair.py
+
+# =================================================
+# APP VERSION (FOR SELECTOR CACHE SCOPE)
+# =================================================
+_APP_VERSIONS = {}
+
+
+def get_app_version(device, package):
+    """WhatsApp ka versionName (dumpsys se), per device+package memoized."""
+    key = (getattr(device, "serial", None), package)
+    if key not in _APP_VERSIONS:
+        version = None
+        try:
+            out = device.shell(f"dumpsys package {package}").output
+            m = re.search(r"versionName=(\S+)", out or "")
+            if m:
+                version = m.group(1)
+        except Exception:
+            pass
+        _APP_VERSIONS[key] = version
+    return _APP_VERSIONS[key]
+
+
+def selector_scope(device, package):
+    return android_scope(package, get_app_version(device, package))
+
+
+_RESOLUTIONS = {}
+
+
+def get_resolution(device):
+    """Screen resolution as 'WxH' (coordinate cache key), memoized per device."""
+    key = getattr(device, "serial", None)
+    if key not in _RESOLUTIONS:
+        try:
+            w, h = device.window_size()
+            _RESOLUTIONS[key] = f"{w}x{h}"
+        except Exception:
+            return None
+    return _RESOLUTIONS[key]
+
+
+def point_step(step, resolution):
+    """Cache step name for resolution-keyed tap coordinates."""
+    return f"{step}@{resolution}"
+
+
+# =================================================
+# BUTTON DETECTOR
+# =================================================
+def detect_buttons(device):
+    with HIERARCHY_DUMP_SECONDS.time():
+        xml = device.dump_hierarchy()
+    root = ET.fromstring(xml)
+    buttons = []
+
+    def center(bounds):
+        nums = list(map(int, re.findall(r"\d+", bounds)))
+        if len(nums) == 4:
+            x1, y1, x2, y2 = nums
+            return (x1 + x2) // 2, (y1 + y2) // 2
+        return None
+
+    def walk(node):
+        a = node.attrib
+        pkg = a.get("package", "")
+        cls = a.get("class", "") or ""
+        text_raw = a.get("text", "") or ""
+        desc_raw = a.get("content-desc", "") or a.get("content_desc", "") or ""
+        res_raw = a.get("resource-id", "") or ""
+        text = text_raw.strip().lower()
+        desc = desc_raw.strip().lower()
+        res = res_raw.strip().lower()
+        bounds = a.get("bounds", "")
+        clickable = a.get("clickable", "false")
+
+        # consider element if clickable or looks like a button or has text/desc/res
+        if bounds and (clickable == "true" or "button" in cls.lower() or text or desc or res):
+            c = center(bounds)
+            if c:
+                buttons.append({
+                    "pkg": pkg,
+                    "class": cls,
+                    "text": text,
+                    "text_raw": text_raw,
+                    "desc": desc,
+                    "desc_raw": desc_raw,
+                    "res": res,
+                    "res_raw": res_raw,
+                    "x": c[0],
+                    "y": c[1]
+                })
+
+        for ch in node:
+            walk(ch)
+
+    walk(root)
+    return buttons
+
+
+# =================================================
+# CLEAR RECENT APPS (MIUI REAL SWIPE)
+# =================================================
+def clear_recent_apps(device, max_swipes=10):
+    print("🧹 Clearing recent apps")
+    device.shell("input keyevent KEYCODE_APP_SWITCH")
+    time.sleep(2)
+
+    for _ in range(max_swipes):
+        buttons = detect_buttons(device)
+        cards = [b for b in buttons if "unlocked" in b["desc"]]
+
+        if not cards:
+            print("✅ Recent apps cleared")
+            break
+
+        b = cards[0]
+        device.shell(
+            f"input swipe {b['x']} {b['y']} {b['x'] - 700} {b['y']} 200"
+        )
+        time.sleep(0.5)
+
+    device.shell("input keyevent KEYCODE_HOME")
+    time.sleep(1)
+
+
+# =================================================
+# FAST RECENTS RESET (ONE SNAPSHOT, PLANNED SWIPES)
+# =================================================
+# WA_RECENTS_RESET=legacy purana per-card dump loop (clear_recent_apps) chalata hai.
+_RECENT_TASK_RE = re.compile(r"\* Recent #\d+: Task.*")
+_TASK_AFFINITY_RE = re.compile(r"\bA=(?:\d+:)?([\w.]+)")
+_TASK_TYPE_RE = re.compile(r"\btype=(\w+)")
+_TASK_USER_RE = re.compile(r"\bU=(\d+)")
+_DISMISS_ALL_WORDS = ("clear all", "close all", "clearanimview", "clear_all")
+DUMP_SECONDS_ESTIMATE = 0.8  # typical dump_hierarchy cost, legacy per-card scan ke estimate ke liye
+
+
+def recent_task_packages(device):
+    """`dumpsys activity recents` se standard (non-home) tasks ke (package, user) pairs.
+
+    User (U=) na mile to None - dual / work-profile WhatsApp ke tasks alag pehchane jate hain.
+
+    None = output parse nahi hua (koi "* Recent #" line nahi - OEM format alag ya
+    command fail); aisi halat me caller switcher skip na kare.
+    """
+    try:
+        out = device.shell("dumpsys activity recents").output
+    except Exception:
+        return None
+    lines = _RECENT_TASK_RE.findall(out or "")
+    if not lines:
+        return None
+    tasks = []
+    for line in lines:
+        pkg = _TASK_AFFINITY_RE.search(line)
+        kind = _TASK_TYPE_RE.search(line)
+        if not pkg or (kind and kind.group(1) != "standard"):
+            continue
+        user = _TASK_USER_RE.search(line)
+        task = (pkg.group(1), int(user.group(1)) if user else None)
+        if task not in tasks:
+            tasks.append(task)
+    return tasks
+
+
+def _wait_for_cards(device, timeout=2.0):
+    """Switcher khulte hi pehla usable snapshot (fixed 2s sleep ki jagah)."""
+    end = time.time() + timeout
+    buttons = []
+    while True:
+        buttons = detect_buttons(device)
+        if any("unlocked" in b["desc"] for b in buttons) or time.time() >= end:
+            return buttons
+        time.sleep(0.2)
+
+
+def reset_recent_apps(device, package=None, user_id=None):
+    """Recents clear: ek snapshot se saare swipes plan, dismiss-all ho to wahi.
+
+    Agar recents me sirf target instance (package + user) hai (dumpsys me tasks
+    sach me listed) to switcher khulta hi nahi - force-stop kaafi hai; dusre user
+    ka WhatsApp task ho to switcher chalta hai (force-stop sirf is user ka hai). Legacy per-card loop se time saving print hoti hai.
+    """
+    if os.environ.get("WA_RECENTS_RESET", "").strip().lower() == "legacy":
+        return clear_recent_apps(device)
+
+    t0 = time.time()
+    tasks = recent_task_packages(device)
+    if tasks and all(task == (package, user_id) for task in tasks):
+        # Legacy: switcher + 2s + one empty scan + home + 1s
+        legacy = 3 + 2 * DUMP_SECONDS_ESTIMATE
+        took = time.time() - t0
+        print(f"🧹 Recents: only target app, switcher skipped ({took:.1f}s, ~{legacy - took:.1f}s saved)")
+        return
+
+    print("🧹 Clearing recent apps (planned)")
+    device.shell("input keyevent KEYCODE_APP_SWITCH")
+    buttons = _wait_for_cards(device)
+    cards = [b for b in buttons if "unlocked" in b["desc"]]
+    dismiss_all = [b for b in buttons
+                   if any(w in f"{b['text']} {b['desc']} {b['res']}" for w in _DISMISS_ALL_WORDS)]
+    initial = len(cards)
+
+    if dismiss_all and cards:
+        b = dismiss_all[0]
+        device.shell(f"input tap {b['x']} {b['y']}")
+        print("  ✅ Dismiss-all")
+        time.sleep(0.5)
+    else:
+        # Last card pehle: baaki cards apni jagah rehte hain, isliye ek hi snapshot kaafi
+        for b in sorted(cards, key=lambda c: (c["y"], c["x"]), reverse=True):
+            device.shell(f"input swipe {b['x']} {b['y']} {b['x'] - 700} {b['y']} 200")
+        if cards:
+            time.sleep(0.4)
+            left = [b for b in detect_buttons(device) if "unlocked" in b["desc"]]
+            if left:
+                print(f"  ↩️ {len(left)} card(s) left after planned swipes, legacy sweep")
+                for b in left[:3]:
+                    device.shell(f"input swipe {b['x']} {b['y']} {b['x'] - 700} {b['y']} 200")
+                    time.sleep(0.5)
+
+    device.shell("input keyevent KEYCODE_HOME")
+    time.sleep(0.5)
+
+    took = time.time() - t0
+    # Legacy: 2s settle + har card pe (dump + 0.5s) + final empty dump + 1s home
+    legacy = 2 + initial * (DUMP_SECONDS_ESTIMATE + 0.5) + DUMP_SECONDS_ESTIMATE + 1
+    print(f"✅ Recent apps cleared: {initial} card(s) in {took:.1f}s (~{max(0.0, legacy - took):.1f}s saved)")
+
+
+# =================================================
+# DIRECT LAUNCH (RESOLVED ACTIVITY PER USER)
+# =================================================
+_FOCUS_RE = re.compile(r"mCurrentFocus=Window\{\S+ (?:u(\d+) )?([\w.]+)/([\w.$]+)")
+_CHOOSER_PACKAGES = ("android", "com.android.systemui", "com.miui.securitycore", "com.android.intentresolver")
+_LAUNCH_COMPONENTS = {}
+
+
+# Android 10+ pe `dumpsys window windows` me mCurrentFocus nahi hota; `displays`
+# (chhota output) ya poora `dumpsys window` try karo. Jo command kaam kare woh per device yaad.
+_FOCUS_COMMANDS = ("dumpsys window displays", "dumpsys window", "dumpsys window windows")
+_FOCUS_COMMAND = {}
+
+
+def focused_window(device):
+    """Focused window (package, activity, user) `dumpsys window` se - hierarchy dump nahi.
+
+    user None ho sakta hai (purane ROMs); pura None agar focus pata na chale.
+    """
+    serial = getattr(device, "serial", None)
+    known = _FOCUS_COMMAND.get(serial)
+    for cmd in ((known,) if known else _FOCUS_COMMANDS):
+        try:
+            out = device.shell(f"{cmd} | grep -E mCurrentFocus").output
+        except Exception:
+            continue
+        if "mCurrentFocus" not in (out or ""):
+            continue  # is ROM pe ye command focus nahi dikhata
+        _FOCUS_COMMAND[serial] = cmd
+        m = _FOCUS_RE.search(out)
+        if not m:
+            return None  # e.g. mCurrentFocus=null (transition)
+        user, pkg, activity = m.groups()
+        return pkg, activity, int(user) if user is not None else None
+    return None
+
+
+def is_chooser_window(window):
+    pkg, activity = window[:2]
+    return pkg in _CHOOSER_PACKAGES or "Resolver" in activity or "Chooser" in activity
+
+
+def resolve_launch_component(device, package, user_id):
+    """Selected user ke liye exact launcher activity (memoized per device+user)."""
+    key = (getattr(device, "serial", None), package, user_id)
+    if key not in _LAUNCH_COMPONENTS:
+        component = f"{package}/com.whatsapp.Main"
+        try:
+            out = device.shell(
+                f"cmd package resolve-activity --brief --user {user_id} "
+                f"-a android.intent.action.MAIN -c android.intent.category.LAUNCHER {package}"
+            ).output
+            last = (out or "").strip().splitlines()[-1:]
+            if last and last[0].startswith(package + "/"):
+                component = last[0].strip()
+        except Exception:
+            pass
+        _LAUNCH_COMPONENTS[key] = component
+    return _LAUNCH_COMPONENTS[key]
+
+
+def launch_whatsapp(device, package, user_id):
+    """Resolved component ko seedha us user me start karta hai (chooser ka mauka nahi).
+
+    MAIN/LAUNCHER intent: app chal raha ho to uska existing task front pe aata hai.
+    """
+    component = resolve_launch_component(device, package, user_id)
+    device.shell(f"am start --user {user_id} -a android.intent.action.MAIN "
+                 f"-c android.intent.category.LAUNCHER -n {component}")
+
+
+# =================================================
+# HANDLE APP CHOOSER (POSITION-BASED – DUAL SAFE)
+# =================================================
+def _chooser_step(pkg, user_id):
+    return f"chooser:{pkg}:{user_id}"
+
+
+def _pick_from_chooser(device, pkg, user_id, buttons):
+    chooser = [
+        b for b in buttons
+        if b["pkg"] in _CHOOSER_PACKAGES and b["text"]
+    ]
+    if len(chooser) < 2:
+        return None
+
+    chooser.sort(key=lambda x: x["y"])
+
+    if pkg == "com.whatsapp" and user_id != 0:
+        target = chooser[1]   # DUAL
+        print("✅ Selecting DUAL WhatsApp (2nd option)")
+    else:
+        target = chooser[0]   # NORMAL / BUSINESS
+        print("✅ Selecting NORMAL WhatsApp (1st option)")
+    return target["x"], target["y"]
+
+
+def _tap(device, x, y):
+    try:
+        device.click(x, y)
+    except Exception:
+        device.shell(f"input tap {x} {y}")
+
+
+def handle_app_chooser(device, pkg, user_id, timeout=None, cache=None):
+    """Chooser aaye to sahi option choose karta hai.
+
+    Focused window (cheap) se turant pata chalta hai ki target khul gaya ya
+    chooser dikh raha hai; chooser ke liye is device ka yaad kiya hua tap
+    point pehle, warna ek snapshot se pick karke yaad rakhta hai.
+    `timeout=None` = is device ki history se deadline (default 6s).
+    """
+    print("🔎 Checking for app chooser…")
+    cache = cache or get_selector_cache()
+    scope, step = device_scope(getattr(device, "serial", None)), _chooser_step(pkg, user_id)
+    history = instance_scope(device) if timeout is None else None
+    t0 = time.time()
+    end = t0 + (deadline("chooser", 6, history) if history else timeout)
+
+    def settled():
+        if history:
+            record_step("chooser", time.time() - t0, history)
+
+    while time.time() < end:
+        window = focused_window(device)
+        if window and window[0] == pkg and window[2] in (None, user_id):
+            print("ℹ️ No chooser dialog (WhatsApp already focused)")
+            return False  # kuch wait hi nahi hua - sample deadline ko neeche kheench dega
+
+        if window is None or is_chooser_window(window):
+            learned = cache.get(scope, step) if window else None
+            if learned and learned.get("kind") == "xy":
+                x, y = learned["value"]
+                _tap(device, x, y)
+                time.sleep(0.5)
+                after = focused_window(device)
+                if after is None or not is_chooser_window(after):
+                    print("✅ Chooser: remembered layout")
+                    settled()
+                    return True
+                cache.forget(scope, step)
+
+            point = _pick_from_chooser(device, pkg, user_id, detect_buttons(device))
+            if point:
+                _tap(device, *point)
+                cache.record(scope, step, "xy", list(point))
+                time.sleep(1)
+                settled()
+                return True
+
+        time.sleep(0.3)
+
+    print("ℹ️ No chooser dialog detected")
+    if history:
+        record_step("chooser", None, history)
+    return False
+
+
+# =================================================
+# WAIT FOR WHATSAPP (TIERED PROBES, DUAL-SAFE)
+# =================================================
+# Tier 1: focused window (package + user), tier 2: resumed activity (user
+# ke saath). Hierarchy dump tabhi jab ye ambiguous hon (focus unknown, ya
+# WhatsApp dikh raha hai par user confirm nahi - dual app user 999).
+_RESUMED_RE = re.compile(r"mResumedActivity: ActivityRecord\{\S+ u(\d+) ([\w.]+)/")
+READY_TIER_COUNTS = {}
+
+
+def resumed_activity(device):
+    """(package, user) of the resumed activity, ya None."""
+    try:
+        out = device.shell("dumpsys activity activities | grep -E mResumedActivity").output
+    except Exception:
+        return None
+    m = _RESUMED_RE.search(out or "")
+    return (m.group(2), int(m.group(1))) if m else None
+
+
+def process_running(device, pkg, user_id):
+    """Us user ka WhatsApp process chal raha hai? (ps USER column u<user>_aNNN). None = pata nahi."""
+    try:
+        out = device.shell("ps -A -o USER,NAME").output
+    except Exception:
+        return None
+    prefix = f"u{user_id}_" if user_id is not None else "u"
+    for line in (out or "").splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[-1] == pkg and parts[0].startswith(prefix):
+            return True
+    return False
+
+
+def _ui_ready_from_dump(device, pkg):
+    buttons = detect_buttons(device)
+    return any(
+        b["pkg"] == pkg and (
+            "menuitem_overflow" in b["res"]
+            or "new chat" in b["text"]
+            or "chats" in b["text"]
+        )
+        for b in buttons
+    )
+
+
+def probe_whatsapp_ready(device, pkg, user_id=None):
+    """Ek probe round. Returns resolving tier ("focus"/"resumed"/"dump") ya None."""
+    window = focused_window(device)
+    if window and window[0] == pkg and (user_id is None or window[2] in (None, user_id)):
+        if window[2] is not None or user_id in (None, 0):
+            return "focus"
+
+    resumed = resumed_activity(device)
+    if resumed and resumed[0] == pkg and (user_id is None or resumed[1] == user_id):
+        return "resumed"
+
+    # Clear answer: kuch aur foreground me hai -> abhi ready nahi, dump ki zaroorat nahi
+    if window and resumed and window[0] != pkg and resumed[0] != pkg:
+        return None
+    if process_running(device, pkg, user_id) is False:
+        return None
+
+    # Ambiguous (focus unknown / same package but user not confirmed)
+    return "dump" if _ui_ready_from_dump(device, pkg) else None
+
+
+def wait_for_whatsapp(device, pkg, timeout=None, user_id=None):
+    """`timeout=None` = is instance ki readiness history se deadline (default 20s)."""
+    print("⏳ Waiting for WhatsApp to be ready...")
+    history = instance_scope(device, pkg, user_id) if timeout is None else None
+    t0 = time.time()
+    end = t0 + (deadline("whatsapp_ready", 20, history) if history else timeout)
+
+    while time.time() < end:
+        tier = probe_whatsapp_ready(device, pkg, user_id)
+        if tier:
+            READY_TIER_COUNTS[tier] = READY_TIER_COUNTS.get(tier, 0) + 1
+            print(f"✅ WhatsApp ready in {time.time() - t0:.1f}s (probe tier: {tier})")
+            if history:  # fixed-timeout calls (e.g. 5s checks) ki history nahi - censored samples
+                record_step("whatsapp_ready", time.time() - t0, history)
+            return True
+        time.sleep(0.3)
+
+    READY_TIER_COUNTS["timeout"] = READY_TIER_COUNTS.get("timeout", 0) + 1
+    if history:
+        record_step("whatsapp_ready", None, history)
+    return False
+
+
+# =================================================
+# RESET + OPEN WHATSAPP
+# =================================================
+# WA_LAUNCH_MODE=warm: chal rahe instance ko front pe laake in-app chats pe
+# reset; app unresponsive ho tabhi force-stop + cold start. Default cold.
+LAUNCH_TIMINGS = {"cold": [], "warm": []}
+_ANR_WORDS = ("isn't responding", "not responding", "close app")
+READY_RETRY = RetryPolicy(attempts=2, base=2.0)  # ek relaunch
+
+
+def launch_mode():
+    return "warm" if os.environ.get("WA_LAUNCH_MODE", "").strip().lower() == "warm" else "cold"
+
+
+def _on_chats(device, package):
+    """Chats screen (overflow menu dikhta hai) - selector query, dump nahi."""
+    sel = _learned_selector(get_selector_cache(), selector_scope(device, package), "menu")
+    try:
+        if sel and device(packageName=package, **sel).exists:
+            return True
+        return device(resourceId=f"{package}:id/menuitem_overflow").exists
+    except Exception:
+        return False
+
+
+def _anr_dialog(device):
+    try:
+        return any(device(textContains=w).exists for w in _ANR_WORDS)
+    except Exception:
+        return False
+
+
+def warm_start_whatsapp(device, package, user_id, max_backs=4):
+    """Running instance ko foreground + chats pe reset. False = cold start chahiye."""
+    if not process_running(device, package, user_id):
+        print("🧊 WhatsApp not running for this user, warm start not possible")
+        return False
+
+    print("🔥 Warm start: bringing WhatsApp to foreground")
+    launch_whatsapp(device, package, user_id)
+    handle_app_chooser(device, package, user_id, timeout=2)
+    if not wait_for_whatsapp(device, package, timeout=5, user_id=user_id) or _anr_dialog(device):
+        print("⚠️ WhatsApp unresponsive")
+        return False
+
+    # In-app reset: back tab tak jab tak chats na dikhe (chats pe back = app exit)
+    for _ in range(max_backs):
+        if _on_chats(device, package):
+            return True
+        device.press("back")
+        time.sleep(0.5)
+        if not probe_whatsapp_ready(device, package, user_id):
+            # Back ne app se bahar nikal diya - task ko wapas front pe lao (root = chats)
+            launch_whatsapp(device, package, user_id)
+            return wait_for_whatsapp(device, package, timeout=5, user_id=user_id) and _on_chats(device, package)
+    return _on_chats(device, package)
+
+
+def _record_launch(mode, t0):
+    took = time.time() - t0
+    LAUNCH_TIMINGS[mode].append(took)
+    other = "cold" if mode == "warm" else "warm"
+    parts = [f"{mode} {took:.1f}s"]
+    if LAUNCH_TIMINGS[other]:
+        avg = sum(LAUNCH_TIMINGS[other]) / len(LAUNCH_TIMINGS[other])
+        parts.append(f"{other} avg {avg:.1f}s over {len(LAUNCH_TIMINGS[other])} run(s)")
+    print(f"⏱️ WhatsApp launch: {', '.join(parts)}")
+
+
+def open_whatsapp(device, package, user_id, warm=None):
+    """WhatsApp ready karta hai. Returns True/False.
+
+    Cold (default): recents clear, force-stop, relaunch aur UI ready hone ka wait.
+    Warm (`warm=True` ya WA_LAUNCH_MODE=warm): running instance reuse, fail hone par cold.
+    """
+    if warm is None:
+        warm = launch_mode() == "warm"
+    if warm:
+        t0 = time.time()
+        if warm_start_whatsapp(device, package, user_id):
+            _record_launch("warm", t0)
+            return True
+        print("🧊 Falling back to cold start")
+
+    t0 = time.time()
+    if not _cold_start_whatsapp(device, package, user_id):
+        return False
+    _record_launch("cold", t0)
+    return True
+
+
+def _cold_start_whatsapp(device, package, user_id):
+    reset_recent_apps(device, package, user_id)
+
+    print("🛑 Force-stopping WhatsApp")
+    device.shell(f"am force-stop --user {user_id} {package}")
+    time.sleep(1)
+
+    print("📱 Opening WhatsApp…")
+    launch_whatsapp(device, package, user_id)
+
+    handle_app_chooser(device, package, user_id)
+
+    # 🔥 CRITICAL: WAIT UNTIL UI IS READY (na ho to relaunch karke dobara)
+    if not retry(lambda: wait_for_whatsapp(device, package, user_id=user_id), READY_RETRY,
+                 label="WhatsApp readiness", accept=bool,
+                 on_retry=lambda _: launch_whatsapp(device, package, user_id)):
+        return False
+
+    time.sleep(2)
+    return True
+
+
+# =================================================
+# SMART CLICK (FINAL PRIORITY LOGIC + LEARNED SELECTORS)
+# =================================================
+_LEARNED_SELECTOR_ARGS = {"res": "resourceId", "text": "text", "desc": "description"}
+
+
+def smart_click(device, keywords, timeout=None, package=None, step=None, cache=None):
+    """Keywords se WhatsApp element dhoondh ke click karta hai.
+
+    `step` diya ho to last successful selector (package + app version ke
+    scope me) pehle probe hota hai, bina hierarchy dump ke; miss hone par
+    normal discovery chalti hai aur naya winner yaad rakha jata hai.
+    `timeout=None` = is device pe is step ki history se deadline (default 8s).
+    """
+    cache = cache or get_selector_cache()
+    scope = selector_scope(device, package) if step else None
+    history_step, history = f"click:{step or 'any'}", instance_scope(device)
+    adaptive = timeout is None
+    t0 = time.time()
+    if adaptive:
+        timeout = deadline(history_step, 8, history)
+
+    def remember(kind, value, b=None):
+        # Sirf full discovery ka time history me (deadline usi ke liye hai); learned-id
+        # hits aur fixed-timeout probes isse chhote hain aur p95 gira dete hain
+        if adaptive:
+            record_step(history_step, time.time() - t0, history)
+        if step:
+            cache.record(scope, step, kind, value)
+            resolution = get_resolution(device) if b else None
+            if resolution:
+                cache.record(scope, point_step(step, resolution), "xy", [b['x'], b['y']])
+
+    # 0) learned selector first (no hierarchy dump)
+    learned = cache.get(scope, step) if step else None
+    if learned and learned.get("kind") in _LEARNED_SELECTOR_ARGS:
+        try:
+            obj = device(**{_LEARNED_SELECTOR_ARGS[learned["kind"]]: learned["value"]})
+            if obj.exists(timeout=0.8):
+                obj.click()
+                return True
+        except Exception:
+            pass
+
+    end = time.time() + timeout
+
+    while time.time() < end:
+        buttons = detect_buttons(device)
+        if package:
+            wa = [b for b in buttons if b.get("pkg") == package or package in (b.get("pkg") or "")]
+        else:
+            wa = buttons
+
+        # 1) resource-id matches (preferred)
+        for b in wa:
+            if b.get('res') and any(k in b['res'] for k in keywords):
+                try:
+                    rid = b.get('res_raw')
+                    if rid and device(resourceId=rid).exists(timeout=0.8):
+                        device(resourceId=rid).click()
+                        remember("res", rid, b)
+                        return True
+                except Exception:
+                    pass
+                # fallback: click center
+                try:
+                    device.click(b['x'], b['y'])
+                    remember("res", b.get('res_raw'), b)
+                    return True
+                except Exception:
+                    pass
+
+        # 2) text matches
+        for b in wa:
+            try:
+                txt = b.get('text_raw')
+                if txt and any(k in b.get('text', '') for k in keywords):
+                    if device(text=txt).exists(timeout=0.8):
+                        device(text=txt).click()
+                    else:
+                        device.click(b['x'], b['y'])
+                    remember("text", txt, b)
+                    return True
+            except Exception:
+                pass
+
+        # 3) description matches
+        for b in wa:
+            try:
+                dsc = b.get('desc_raw')
+                if dsc and any(k in b.get('desc', '') for k in keywords):
+                    if device(description=dsc).exists(timeout=0.8):
+                        device(description=dsc).click()
+                    else:
+                        device.click(b['x'], b['y'])
+                    remember("desc", dsc, b)
+                    return True
+            except Exception:
+                pass
+
+        time.sleep(0.4)
+
+    if adaptive:
+        record_step(history_step, None, history)
+    return False
+
+
+# =================================================
+# LINK FLOW NAVIGATION (FAST PATH + DISCOVERY FALLBACK)
+# =================================================
+# (step, message, label, keywords, pause after discovery click, required)
+LINK_FLOW_STEPS = [
+    ("menu", "⋮ Opening menu", "Menu", ["menuitem_overflow", "more"], 1, True),
+    ("linked_devices", "🔗 Opening Linked devices", "Linked devices", ["linked"], 2, True),
+    ("link_device", "🟢 Clicking Link a device", "Link a device", ["link_device"], 2, True),
+    ("link_with_phone", "📞 Clicking Link with phone number", "Link with phone number", ["phone"], 3, False),
+]
+
+
+def _learned_selector(cache, scope, step):
+    learned = cache.get(scope, step)
+    if learned and learned.get("kind") in _LEARNED_SELECTOR_ARGS:
+        return {_LEARNED_SELECTOR_ARGS[learned["kind"]]: learned["value"]}
+    return None
+
+
+def fast_click(device, package, step, cache=None, timeout=1.5):
+    """Learned resource-id (ya resolution-keyed coordinates) se click, bina hierarchy dump.
+
+    Coordinates sirf tab jab koi id learned hi nahi hai - id learned hai par
+    screen pe nahi mila to screen badli hui hai, wahan blind tap galat click
+    hoga; None lauta ke discovery pe chhod do.
+    Returns "id", "xy" ya None (kuch learned nahi / element nahi mila).
+    """
+    cache = cache or get_selector_cache()
+    scope = selector_scope(device, package)
+
+    sel = _learned_selector(cache, scope, step)
+    if sel:
+        try:
+            obj = device(**sel)
+            if obj.exists(timeout=timeout):
+                obj.click()
+                return "id"
+        except Exception:
+            pass
+        return None
+
+    resolution = get_resolution(device)
+    point = cache.get(scope, point_step(step, resolution)) if resolution else None
+    if point and isinstance(point.get("value"), list) and len(point["value"]) == 2:
+        try:
+            device.click(*point["value"])
+            return "xy"
+        except Exception:
+            pass
+    return None
+
+
+def verify_step(device, package, step, next_step, cache=None, timeout=3):
+    """Lightweight post-click check (single selector query, no dump).
+
+    Next step ka learned element aa gaya = verified. Last step ke liye
+    uska apna element gayab ho jana = verified. Returns True/False, ya
+    None agar verify karne ke liye kuch learned nahi hai.
+    """
+    cache = cache or get_selector_cache()
+    scope = selector_scope(device, package)
+    try:
+        if next_step:
+            sel = _learned_selector(cache, scope, next_step)
+            return device(**sel).exists(timeout=timeout) if sel else None
+        sel = _learned_selector(cache, scope, step)
+        return device(**sel).wait_gone(timeout=timeout) if sel else None
+    except Exception:
+        return False
+
+
+LINK_FLOW_BY_STEP = {s[0]: s for s in LINK_FLOW_STEPS}
+
+
+def run_link_step(device, package, step, next_step=None, cache=None, user_id=None):
+    """Ek LINK_FLOW step: fast path (learned id / coordinates + verification),
+    verification fail hone par hi smart_click discovery. "link_device" se pehle
+    us instance (package + user) ka linked-devices baseline record hota hai.
+
+    Returns "fast" (verified fast path), "clicked", ya None (element nahi mila).
+    """
+    cache = cache or get_selector_cache()
+    _, message, label, keywords, pause, required = LINK_FLOW_BY_STEP[step]
+    print(message)
+    if step == "link_device":
+        remember_linked_devices(device, package, user_id)
+
+    how = fast_click(device, package, step, cache=cache)
+    if how:
+        verified = verify_step(device, package, step, next_step, cache=cache)
+        if verified:
+            print(f"  ⚡ Fast path ({how}) verified")
+            return "fast"
+        if verified is None:
+            # Nothing learned to verify against - trust the click like discovery does
+            print(f"  ⚡ Fast path ({how}) clicked (unverified)")
+            time.sleep(pause)
+            return "clicked"
+        print("  ↩️ Fast path not verified, falling back to discovery")
+
+    # Discovery (normal deadline); na mile to None - required step ka label caller report karta hai
+    if not smart_click(device, keywords, package=package, step=step, cache=cache):
+        return None
+    time.sleep(pause)
+    return "clicked"
+
+
+def navigate_to_phone_link(device, package, cache=None, start_step=None, user_id=None):
+    """Menu -> Linked devices -> Link a device -> Link with phone number.
+
+    `start_step` diya ho to flow wahin se shuru hota hai (e.g. already Linked
+    devices pe). Returns None on success, warna us required step ka label jo
+    nahi mila.
+    """
+    cache = cache or get_selector_cache()
+    fast_hits = 0
+    steps = LINK_FLOW_STEPS
+    if start_step:
+        steps = steps[[s[0] for s in steps].index(start_step):]
+
+    for i, (step, message, label, keywords, pause, required) in enumerate(steps):
+        next_step = steps[i + 1][0] if i + 1 < len(steps) else None
+        result = run_link_step(device, package, step, next_step, cache=cache, user_id=user_id)
+        if result == "fast":
+            fast_hits += 1
+        elif result is None and required:
+            return label
+
+    print(f"⚡ Fast navigation: {fast_hits}/{len(steps)} steps without discovery")
+    return None
+
+
+def resume_phone_link(device, package, cache=None, user_id=None):
+    """Relaunch ke bina wapas "Link with phone number" code screen pe.
+
+    Pichle code ke baad WhatsApp ya to Linked devices pe hota hai (link ho
+    gaya) ya code entry screen pe (code expire / fail). Dono se seedha aage
+    navigate karta hai. False = screen pehchani nahi, caller relaunch kare.
+    """
+    cache = cache or get_selector_cache()
+    try:
+        if device(packageName=package, className="android.widget.EditText").exists:
+            # Stale code screen -> back to the QR scanner, which has "Link with phone number"
+            device.press("back")
+            time.sleep(1)
+            return navigate_to_phone_link(device, package, cache=cache, start_step="link_with_phone",
+                                          user_id=user_id) is None
+        if on_linked_devices_screen(device, package, cache=cache):
+            return navigate_to_phone_link(device, package, cache=cache, start_step="link_device",
+                                          user_id=user_id) is None
+    except Exception as e:
+        print(f"⚠️ Could not resume link screen: {e}")
+    return False
+
+
+# =================================================
+# PHONE-SIDE LINK COMPLETION SIGNAL
+# =================================================
+# Linked devices list ki har row me "Active now" / "Last active ..." hota hai.
+# "Link a device" screen pe wapas aana akela kaafi nahi (back / code reject pe bhi
+# wahi screen) - isliye code entry se pehle ki row count (baseline) se badhna chahiye.
+# Baseline per instance (serial, package, user): dual / work-profile WhatsApp ke
+# linked devices alag hain. Baseline na ho to phone-side confirmation band
+# (browser hi confirm kare) - "koi bhi row" pe link maan lena galat positive deta hai.
+_LINKED_ROW_RE = "(?i)^(active now|last active.*)$"
+_LINKED_BASELINE = {}
+
+
+def _baseline_key(device, package, user_id):
+    return getattr(device, "serial", None), package, user_id
+
+
+def linked_device_count(device, package):
+    """Linked devices screen pe kitne devices listed hain. None = count nahi ho saka."""
+    try:
+        return device(packageName=package, textMatches=_LINKED_ROW_RE).count
+    except Exception:
+        return None
+
+
+def remember_linked_devices(device, package, user_id=None):
+    """Code entry se pehle (Linked devices screen pe) row count baseline yaad rakho."""
+    count = linked_device_count(device, package)
+    if count is not None:
+        _LINKED_BASELINE[_baseline_key(device, package, user_id)] = count
+
+
+def forget_linked_devices(device, package, user_id=None):
+    """Naya navigation shuru - purana baseline (manual unlink ke baad galat ho sakta hai) hatao."""
+    _LINKED_BASELINE.pop(_baseline_key(device, package, user_id), None)
+
+
+def linked_devices_baseline(device, package, user_id=None):
+    return _LINKED_BASELINE.get(_baseline_key(device, package, user_id))
+
+
+def on_linked_devices_screen(device, package, cache=None):
+    """Pairing screen band aur Linked devices list dikh rahi hai (sirf selector queries)."""
+    cache = cache or get_selector_cache()
+    try:
+        if device(packageName=package, className="android.widget.EditText").exists:
+            return False  # still on the code entry screen
+        sel = _learned_selector(cache, selector_scope(device, package), "link_device")
+        if sel and device(packageName=package, **sel).exists:
+            return True
+        return device(packageName=package, textMatches="(?i)link a device").exists
+    except Exception:
+        return False
+
+
+def phone_link_confirmed(device, package, cache=None, user_id=None):
+    """True jab Linked devices list wapas dikhe aur usme naya device aa gaya ho.
+
+    Successful link ke baad WhatsApp khud Linked devices screen pe laut aata
+    hai; row count us instance ke baseline (code entry se pehle) se zyada hona
+    chahiye. Baseline nahi hai to False - phone se confirm nahi kar sakte.
+    """
+    key = _baseline_key(device, package, user_id)
+    baseline = _LINKED_BASELINE.get(key)
+    if baseline is None or not on_linked_devices_screen(device, package, cache=cache):
+        return False
+    count = linked_device_count(device, package)
+    if count is None or count <= baseline:
+        return False
+    _LINKED_BASELINE[key] = count  # agla code isi list ke against
+    return True
+
+
+# =================================================
+# ENTER CODE ON PHONE
+# =================================================
+def enter_code_on_phone(device, code: str) -> bool:
+    """Phone me code enter karta hai."""
+    if not code:
+        return False
+
+    # Remove hyphen for phone entry
+    clean_code = code.replace("-", "").strip()
+    print(f"📲 Entering code on phone: {code} (sending as {clean_code})")
+
+    try:
+        # Strategy 1: Find focused element or any EditText and type
+        # Sometimes fields are split (8 EditTexts), sometimes one hidden EditText
+        edit_texts = device(className="android.widget.EditText")
+        if edit_texts.exists(timeout=2):
+            edit_texts[0].click()  # Click first one to focus
+            time.sleep(0.5)
+            device.shell(f"input text '{clean_code}'")
+            print("✅ Code entered via ADB input text")
+            return True
+
+        # Strategy 2: If no EditText found (custom views), assume focus is ready
+        time.sleep(1)
+        device.shell(f"input text '{clean_code}'")
+        print("✅ Code entered via ADB input text (fallback)")
+        return True
+
+    except Exception as e:
+        print(f"⚠️ Failed to enter code: {e}")
+        return False
@@ -0,0 +1,626 @@
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from wa_debug import DebugArtifacts
+from wa_deadlines import deadline, record_step
+from wa_memory import browser_tree_rss
+from wa_metrics import BROWSER_LAUNCH_SECONDS, BROWSER_RSS_MEGABYTES, CODE_DETECTION_SECONDS, LIVE_BROWSERS
+from wa_ocr import OCR_AVAILABLE, CodeOcr
+from wa_retry import RetryPolicy, retry, web_breaker
+from wa_selector_cache import get_selector_cache, web_scope
+from wa_web import (
+    CODE_SELECTORS,
+    IpcStats,
+    click_link_with_phone,
+    click_next,
+    find_code_in_selectors,
+    find_phone_input,
+    use_legacy_discovery,
+)
+
+# Sirf availability check (find_spec import nahi karta); playwright khud
+# start_playwright() me load hota hai, taaki import-time sasta rahe.
+PLAYWRIGHT_AVAILABLE = importlib.util.find_spec("playwright") is not None
+
+# =================================================
+# LOW-MEMORY LAUNCH PROFILE
+# =================================================
+# WA_BROWSER_PROFILE=lowmem: ek host pe zyada sessions pack karne ke liye
+# (CPU se pehle memory khatam hoti hai). Renderer/process count kam, JS heap
+# cap, background features band aur chhota viewport. Default "standard".
+LOWMEM_VIEWPORT = {"width": 960, "height": 720}  # WhatsApp Web ka link screen isme poora aata hai
+LOWMEM_JS_HEAP_MB = 384
+NAV_RETRY = RetryPolicy(attempts=3, base=2.0)
+
+
+def browser_profile():
+    return "lowmem" if (os.environ.get("WA_BROWSER_PROFILE") or "").lower() == "lowmem" else "standard"
+
+
+def lowmem_args():
+    heap = int(os.environ.get("WA_JS_HEAP_MB") or LOWMEM_JS_HEAP_MB)
+    return [
+        "--renderer-process-limit=1",            # saare tabs/frames ek renderer me
+        "--process-per-site",
+        "--disable-site-isolation-trials",       # har origin ka alag process nahi
+        "--disable-features=site-per-process,IsolateOrigins,Translate,MediaRouter,OptimizationHints,"
+        "BackForwardCache,AutofillServerCommunication,CalculateNativeWinOcclusion,HeavyAdIntervention",
+        f"--js-flags=--max-old-space-size={heap}",
+        "--disable-background-mode",
+        "--disable-notifications",
+        "--mute-audio",
+        "--aggressive-cache-discard",
+        "--disk-cache-size=1048576",
+        "--media-cache-size=1048576",
+        f"--window-size={LOWMEM_VIEWPORT['width']},{LOWMEM_VIEWPORT['height']}",
+    ]
+
+
+class BrowserState:
+    """Ek session ka browser: playwright (agar humne start kiya), browser, context, page.
+
+    Code milne ke baad bhi open rehta hai (linking ke dauran). LinkSession
+    apna state rakhta hai; scripts thread-local default state use karti hain.
+    """
+
+    def __init__(self):
+        self.playwright = None  # sirf tab set jab is state ne driver start kiya ho
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.user_data_dir = None  # RSS accounting ke liye (Chromium --user-data-dir)
+        self.rss_marker = None  # regular launch: main process pehchanne wala tag switch
+        self.root_pid = None
+        self.launch_profile = None
+        self.rss = {}  # phase -> MB
+
+
+_THREAD = threading.local()
+
+
+def _default_state():
+    state = getattr(_THREAD, "state", None)
+    if state is None:
+        state = _THREAD.state = BrowserState()
+    return state
+
+
+def safe_sleep(duration):
+    """Sleep that propagates keyboard interrupts so user can exit"""
+    time.sleep(duration)
+
+
+def get_browser_page(state=None):
+    """WhatsApp Web page (login check ke liye); default current thread ka state."""
+    return (state or _default_state()).page
+
+
+def session_paths(profile):
+    """Node.js pattern: <home>/Desktop/<profile>/.wwebjs_auth aur .wwebjs_cache."""
+    base_dir = os.path.join(os.path.expanduser("~"), "Desktop", profile)
+    return os.path.join(base_dir, ".wwebjs_auth"), os.path.join(base_dir, ".wwebjs_cache")
+
+
+def record_rss(state, phase):
+    """Is session ke browser process tree ka RSS (MB) phase ke naam se record karta hai."""
+    pid, rss, procs = browser_tree_rss(state.user_data_dir, state.root_pid, marker=state.rss_marker)
+    if rss is None:
+        if not state.rss:
+            # session_end me rss_mb None kyun hai, log me dikhe
+            print(f"ℹ️ Browser RSS unavailable @{phase} (browser process not found)")
+        return None
+    state.root_pid = pid
+    mb = round(rss / (1024 * 1024), 1)
+    state.rss[phase] = mb
+    BROWSER_RSS_MEGABYTES.observe(mb, phase=phase, launch_profile=state.launch_profile or "standard")
+    print(f"🧠 Browser RSS @{phase}: {mb:.0f} MB ({procs} processes, {state.launch_profile} profile)")
+    return mb
+
+
+# =================================================
+# RESOURCE RECLAMATION (HOLD POLICY)
+# =================================================
+# Outcome ke baad browser kitni der khula rahe - WA_HOLD_POLICY:
+#   close        turant band (unattended / daemon default)
+#   keep[:N]     N seconds (default WA_HOLD_SECONDS=60) ya user window band kare / Ctrl+C tak
+#   inspect      Playwright Inspector (page.pause) - Resume dabane par band
+# "linked" outcome pe browser hamesha turant band hota hai.
+HOLD_POLICIES = ("close", "keep", "inspect")
+DEFAULT_HOLD_SECONDS = 60
+_LIVE_LOCK = threading.Lock()
+_LIVE_BROWSERS = 0
+
+
+def hold_policy(default="close"):
+    """WA_HOLD_POLICY parse karta hai. Returns (policy, seconds)."""
+    raw = (os.environ.get("WA_HOLD_POLICY") or default).strip().lower()
+    name, _, secs = raw.partition(":")
+    if name not in HOLD_POLICIES:
+        print(f"⚠️ Unknown WA_HOLD_POLICY '{raw}', using {default}")
+        name, _, secs = default.partition(":")
+    seconds = int(secs) if secs.isdigit() else int(os.environ.get("WA_HOLD_SECONDS") or DEFAULT_HOLD_SECONDS)
+    return name, seconds
+
+
+def _track_live(delta):
+    global _LIVE_BROWSERS
+    with _LIVE_LOCK:
+        _LIVE_BROWSERS += delta
+    LIVE_BROWSERS.inc(delta)
+
+
+def live_browsers():
+    """Is process me abhi kitne Chromium khule hain."""
+    return _LIVE_BROWSERS
+
+
+def _hold(state, policy, seconds):
+    page = state.page
+    if policy == "inspect":
+        print("🔍 Browser handed to Playwright Inspector - press Resume to close it.")
+        page.pause()
+    elif policy == "keep" and seconds > 0:
+        from playwright.sync_api import TimeoutError as PlaywrightTimeout
+        print(f"⏳ Keeping browser open for {seconds}s (close the window or Ctrl+C to release now)...")
+        # wait_for_event Playwright dispatcher chalata hai - window band hote hi lautta hai
+        # (sleep + is_closed() loop me close event kabhi process nahi hota)
+        try:
+            page.wait_for_event("close", timeout=seconds * 1000)
+        except PlaywrightTimeout:
+            pass
+
+
+def release_browser(state, outcome=None, policy=None, debug=None):
+    """Outcome ke baad hold policy lagao, phir browser + driver deterministically band.
+
+    `policy` (policy, seconds) tuple; None = hold_policy(). Hold ke dauran
+    Ctrl+C ya koi error ho to bhi browser band hota hai.
+    """
+    state = state or _default_state()
+    if state.context is None:
+        # Launch fail hua ho to bhi humara start kiya driver band karo (leak nahi)
+        if state.playwright is not None:
+            close_browser_context(state)
+        return
+    policy, seconds = policy or hold_policy()
+    try:
+        if outcome != "linked" and policy != "close" and state.page is not None:
+            _hold(state, policy, seconds)
+    except KeyboardInterrupt:
+        print("\n👋 Releasing browser...")
+    except Exception as e:
+        print(f"⚠️ Hold ended early: {e}")
+    finally:
+        if debug is not None and outcome not in ("linked", "logged_in") and state.page is not None \
+           and not state.page.is_closed():
+            debug.capture_page(state.page, "whatsapp_web_final_debug", failure=True)
+        close_browser_context(state)
+        print(f"🧹 Browser released ({outcome or 'done'}, {policy}) - live browsers: {live_browsers()}")
+
+
+def start_playwright():
+    """Playwright driver start karta hai (daemon isse warm rakhta hai)."""
+    from playwright.sync_api import sync_playwright
+    return sync_playwright().start()
+
+
+# =================================================
+# BROWSER AUTOMATION FUNCTIONS (PLAYWRIGHT)
+# =================================================
+def open_with_playwright(url, session_dir, phone_number=None, debug=None, playwright=None, hold_open=True,
+                         state=None):
+    """Playwright ka use karke Chromium launch karega specifically.
+       Follows: Link with phone number -> Enter Number -> Get Code.
+       Debug artifacts `debug` (DebugArtifacts) ke level ke hisaab se save hote hain.
+       `playwright` diya ho to wahi (warm) driver use hota hai aur close pe stop nahi hota.
+       Code na mile to bhi browser khula rehta hai; release caller karta hai (release_browser).
+       `hold_open` sirf batata hai ki window inspection ke liye chhodi ja rahi hai.
+       `state` (BrowserState) me browser/page rakha jata hai; default current thread ka state.
+    """
+    state = state or _default_state()
+
+    if debug is None:
+        debug = DebugArtifacts(os.path.basename(os.path.dirname(os.path.abspath(session_dir))))
+    
+    if not PLAYWRIGHT_AVAILABLE:
+        print("❌ Playwright not installed. Falling back to system browser.")
+        if sys.platform.startswith('win'):
+            subprocess.Popen(['cmd', '/c', 'start', url], shell=True)
+        return None
+
+    # WhatsApp Web lagatar fail ho raha ho (blocked / down) to launch hi mat karo
+    site = web_breaker(url)
+    if not site.allow():
+        print(f"🔌 {site.key} circuit open - skipping browser for {site.retry_in():.0f}s")
+        return None
+
+    print(f"🌐 Launching Chromium via Playwright...")
+    try:
+        # Initialize Playwright but DON'T use context manager - keep browser open
+        if playwright is not None:
+            p = playwright
+            state.playwright = None  # owned by the caller, not stopped on close
+        else:
+            p = start_playwright()
+            state.playwright = p
+        
+        # Use the actual persistent session directory
+        try:
+            os.makedirs(session_dir, exist_ok=True)
+            user_data_dir = session_dir
+            print(f"📂 Using persistent profile: {user_data_dir}")
+        except Exception:
+            user_data_dir = tempfile.mkdtemp(prefix="whatsapp_temp_")
+            print(f"⚠️ Could not use session_dir, using temp: {user_data_dir}")
+        
+        # Enhanced launch args to prevent crashes on Windows
+        # Disable GPU, disable dev-shm, disable sandbox, disable various problematic features
+        launch_args = [
+            "--no-sandbox",
+            "--disable-gpu",                         # Disable GPU acceleration (common crash cause)
+            "--disable-dev-shm-usage",              # Use regular memory instead of /dev/shm
+            "--disable-web-resources",              # Disable preloading web resources
+            "--disable-extensions",                 # No extensions
+            "--disable-plugins",                    # No plugins
+            "--no-first-run",                       # Skip first-run setup
+            "--disable-default-apps",               # No default apps
+            "--disable-popup-blocking",             # Allow popups (needed for WhatsApp)
+            "--disable-translate",                  # Disable translation
+            "--disable-sync",                       # Disable sync
+            "--disable-background-networking",      # No background networking
+            "--disable-component-update",           # No component updates
+            "--disable-breakpad",                   # No crash reporter
+            "--disable-client-side-phishing-detection", # Disable phishing detection
+        ]
+        state.launch_profile = browser_profile()
+        state.rss.clear()
+        state.rss_marker = None
+        context_opts = {}
+        if state.launch_profile == "lowmem":
+            launch_args += lowmem_args()
+            context_opts["viewport"] = LOWMEM_VIEWPORT
+        
+        print(f"🔧 Browser args ({state.launch_profile}): {launch_args}")
+        
+        # Launch timeout history se (default 60s)
+        launch_timeout = deadline("browser_launch", 60) * 1000
+        # Try to launch with persistent context
+        launch_t0 = time.time()
+        try:
+            browser = p.chromium.launch_persistent_context(
+                user_data_dir=user_data_dir,
+                headless=False,
+                args=launch_args,
+                timeout=launch_timeout,
+                slow_mo=100,    # Slow down operations for stability
+                **context_opts
+            )
+            state.user_data_dir = user_data_dir
+            BROWSER_LAUNCH_SECONDS.observe(time.time() - launch_t0, mode="persistent")
+            record_step("browser_launch", time.time() - launch_t0)
+            print("✅ Browser launched successfully (persistent context)")
+        except Exception as persistent_err:
+            print(f"⚠️ Persistent context failed: {persistent_err}")
+            record_step("browser_launch", None)
+            print("🔄 Trying regular browser launch instead...")
+            
+            # Fallback: launch regular browser without persistent context
+            # (user-data-dir Playwright ka temp dir hai - RSS ke liye apna tag switch;
+            # Chromium unknown switches ignore karta hai)
+            state.rss_marker = f"--wa-session-tag={uuid.uuid4().hex[:12]}"
+            launch_t0 = time.time()
+            browser = p.chromium.launch(
+                headless=False,
+                args=launch_args + [state.rss_marker],
+                timeout=launch_timeout
+            )
+            BROWSER_LAUNCH_SECONDS.observe(time.time() - launch_t0, mode="regular")
+            print("✅ Browser launched successfully (regular context)")
+        
+        # Store browser context so we can keep it open after code extraction
+        state.browser = browser
+        state.context = browser
+        _track_live(+1)
+        
+        # Create or get page
+        if hasattr(browser, 'pages') and browser.pages:
+            page = browser.pages[0]
+        else:
+            # Regular browser launch - need to create context and page
+            context = browser.new_context(**context_opts)
+            page = context.new_page()
+            state.context = context  # Update context reference
+        
+        state.page = page  # Store page for login check
+        record_rss(state, "launch")
+        
+        # Navigate (jittered backoff retries)
+        safe_sleep(2)  # Give browser time to initialize
+        try:
+            retry(lambda: page.goto(url, timeout=30000, wait_until="domcontentloaded"), NAV_RETRY,
+                  label="WhatsApp Web navigation")
+            print("✅ WhatsApp Web opened in Chromium")
+            site.success()  # breaker sirf endpoint reachability ginta hai; no_code job/profile ka hai
+        except Exception as e:
+            print(f"⚠️ Navigation failed after {NAV_RETRY.attempts} attempts: {e}")
+            site.failure()
+            return None
+
+        try:
+            time.sleep(3)  # Wait for page to fully load
+            
+            # CHECK IF ALREADY LOGGED IN (Persistence check)
+            # If logged in, we will see chat list or profile picture
+            print("🔎 Checking login status...")
+            is_logged_in = False
+            try:
+                # Look for common elements available only when logged in
+                if page.locator("#pane-side").count() > 0 or \
+                   page.get_by_test_id("chat-list").count() > 0 or \
+                   page.locator("div[role='textbox']").count() > 0 or \
+                   page.get_by_title("Profile").count() > 0:
+                    is_logged_in = True
+                    print("✅ ALREADY LOGGED IN! Skipping phone linking.")
+                    return "LOGGED_IN"
+            except Exception:
+                pass
+
+            if not is_logged_in:
+                print("ℹ️ Not logged in yet. Proceeding with linking...")
+        except Exception as e:
+            print(f"⚠️ Could not check login: {e}")
+
+        # DEBUG: Page HTML + screenshot (only at 'always' level, written in background)
+        debug.capture_page(page, "whatsapp_web_debug")
+        record_rss(state, "web_loaded")
+
+        # Learned selectors (and OCR code region) are cached per browser locale
+        selector_cache = get_selector_cache()
+        try:
+            scope = web_scope(page.evaluate("() => navigator.language"))
+        except Exception:
+            scope = web_scope(None)
+
+        # AUTOMATE "Link with phone number" FLOW
+        if phone_number:
+            print(f"📞 Automating 'Link with phone number' for {phone_number}...")
+
+            # In-page discovery (single round trip) unless WA_WEB_DISCOVERY=legacy
+            legacy = use_legacy_discovery()
+            ipc = IpcStats("legacy locators" if legacy else "in-page discovery")
+
+            # 1. Click "Link with phone number" — try multiple selector strategies
+            try:
+                page.wait_for_load_state("networkidle", timeout=15000)
+                time.sleep(2)  # Extra wait for JS to render
+                
+                # Try specific text matches first
+                text_candidates = [
+                    "Log in with phone number",
+                    "Link with phone number",
+                    "Log in with phone",
+                    "Link with phone",
+                    "Login with phone number",
+                    "Sign in with phone",
+                    "Use phone number"
+                ]
+
+                clicked = click_link_with_phone(
+                    page, selector_cache.ordered(scope, "link_with_phone", text_candidates), ipc, legacy=legacy
+                )
+                if clicked:
+                    selector_cache.record(scope, "link_with_phone", "text", clicked)
+                else:
+                    print("⚠️ 'Link with phone number' button not found or not clickable.")
+            except Exception as e:
+                print(f"⚠️ Error finding Link button: {e}")
+
+            # 2. Enter Phone Number
+            try:
+                print("⏳ Waiting for input fields to appear...")
+                # Try multiple input selectors
+                input_selectors = [
+                    "input[type='text']",
+                    "input[type='tel']",
+                    "input",
+                    "textarea",
+                    "[contenteditable='true']",
+                    "[role='textbox']"
+                ]
+                
+                phone_input, sel = find_phone_input(
+                    page, selector_cache.ordered(scope, "phone_input", input_selectors), ipc, legacy=legacy
+                )
+
+                # Try to find the phone input (usually 2nd input if country picker is 1st)
+                if phone_input is not None:
+                    selector_cache.record(scope, "phone_input", "css", sel)
+                    phone_input.scroll_into_view_if_needed()
+                    time.sleep(0.5)
+                    
+                    # Clear any existing text and type the number
+                    phone_input.click()
+                    time.sleep(0.3)
+                    phone_input.clear()
+                    phone_input.type(phone_number, delay=50)
+                    print(f"✅ Entered phone number: {phone_number}")
+                    time.sleep(1)
+                    
+                    # 3. Click NEXT
+                    try:
+                        click_next(page, ipc, legacy=legacy)
+                    except Exception as ne:
+                        print(f"⚠️ Error clicking Next: {ne}")
+                else:
+                    print("⚠️ No input fields found for phone number entry")
+            except Exception as e:
+                print(f"⚠️ Error entering phone number: {e}")
+
+            ipc.report()
+
+        # Code extracting logic - wait for REAL linking code (8 alphanumeric with dash: LXW1-41BJ)
+        # Don't reload page - extract code from current page after phone number is entered
+        time.sleep(2)  # Give page time to generate linking code
+        
+        code_deadline = deadline("web_code", 45)
+        print(f"🔎 Looking for linking code (format XXXX-XXXX, waiting {code_deadline:.0f}s)...")
+        start_time = time.time()
+        
+        # Regex patterns to try - handle various formats including characters separated by newlines
+        regex_std = re.compile(r"\b([A-Z0-9]{4})[\s\-\u2013\u2014\n]+([A-Z0-9]{4})\b")
+        
+        # Pattern to handle code where each character is on its own line: 2\n4\n6\nJ\n-\nX\n5\n4\n4\n1
+        regex_newline = re.compile(r"([A-Z0-9])\n([A-Z0-9])\n([A-Z0-9])\n([A-Z0-9])\n[\-\n]*([A-Z0-9])\n([A-Z0-9])\n([A-Z0-9])\n([A-Z0-9])")
+        
+        attempt = 0
+        code = None
+        body_text = None
+        ocr = CodeOcr(CODE_SELECTORS, cache=selector_cache, scope=scope) if OCR_AVAILABLE else None
+
+        while time.time() - start_time < code_deadline:
+            attempt += 1
+            try:
+                # Get text from multiple sources to be safe
+                body_text = page.inner_text("body")
+                
+                # SAVE DEBUG TEXT ON FIRST ATTEMPT (always level only; on-failure saves last text at timeout)
+                if attempt == 1 and debug.save_text("whatsapp_page_text_debug", body_text):
+                    print(f"\n🔍 DEBUG: Extracted page text (first 1000 chars):\n{body_text[:1000]}\n")
+                
+                # PATTERN 1: Try standard regex first (XXXX-XXXX format)
+                matches = regex_std.finditer(body_text)
+                found_code = None
+                for m in matches:
+                    p1, p2 = m.groups()
+                    
+                    # FILTER: Skip common English words
+                    ignored_words = {"LINK", "WITH", "SCAN", "CODE", "CAST", "STAY", "OPEN", "WHATS", "APPS", "TYPE", "THIS", "YOUR", "MAIN", "MENU", "BACK", "DIGIT", "MODAL", "ENTER", "IPHONE"}
+                    if p1 in ignored_words or p2 in ignored_words:
+                        continue
+                    
+                    found_code = f"{p1}-{p2}"
+                    break
+                
+                if found_code:
+                    code = found_code
+                    print(f"✅ Found linking code (standard): {code}")
+                    debug.capture_screenshot(page, "whatsapp_web_code")
+                    break
+                
+                # PATTERN 2: Try detecting code where each char is on its own line (2\n4\n6\nJ\n-\nX\n5\n4\n4\n1)
+                newline_matches = regex_newline.finditer(body_text)
+                for m in newline_matches:
+                    groups = m.groups()
+                    # Extract the 8 characters (groups 0-3 and 4-7)
+                    code_str = groups[0] + groups[1] + groups[2] + groups[3] + "-" + groups[4] + groups[5] + groups[6] + groups[7]
+                    # Basic validation - should have numbers/letters
+                    if len(code_str) == 9 and code_str[4] == "-":
+                        code = code_str
+                        print(f"✅ Found linking code (newline-separated): {code}")
+                        debug.capture_screenshot(page, "whatsapp_web_code")
+                        break
+                
+                if code:
+                    break
+
+                # FALLBACK: Try to find code in specific WhatsApp container (attempt 5+)
+                if attempt >= 5 and attempt % 5 == 0:
+                    try:
+                        # Common WhatsApp code containers, all scanned in one evaluate
+                        selector, found_code = find_code_in_selectors(page)
+                        if found_code:
+                            code = found_code
+                            print(f"✅ Found linking code in {selector}: {code}")
+                            debug.capture_screenshot(page, "whatsapp_web_code")
+                            break
+                    except Exception:
+                        pass
+
+                # OCR FALLBACK: cropped code-region screenshot (every 3rd attempt, within the code deadline)
+                if ocr and attempt >= 3 and attempt % 3 == 0 and \
+                   time.time() - start_time + ocr.last_ms / 1000 < code_deadline:
+                    found_code = ocr.read_code(page)
+                    if found_code:
+                        code = found_code
+                        print(f"✅ Found linking code (OCR): {code}")
+                        debug.capture_screenshot(page, "whatsapp_web_code")
+                        break
+
+                # Every 5 seconds, show progress
+                if attempt % 5 == 0:
+                    print(f"  ⏳ Waiting... {code_deadline - (time.time() - start_time):.0f}s remaining")
+                    
+            except Exception as e:
+                if attempt % 10 == 0:
+                    print(f"  ⚠️ Error during extraction: {e}")
+            
+            time.sleep(1)  # Check every 1 second
+        
+        if not code:
+            print(f"⚠️ Linking code not found after {code_deadline:.0f}s.")
+            record_step("web_code", None)
+            if debug.capture_page(page, "whatsapp_web_code_timeout", text=body_text, failure=True):
+                print("📸 Saving debug artifacts in background...")
+            print("💡 Check WhatsApp Web screen and enter code manually if available.")
+            debug.flush()
+            if hold_open:
+                # Browser abhi band nahi hota; session end pe WA_HOLD_POLICY ke hisaab se release hota hai
+                print("\n🔒 Browser window remains OPEN (released per hold policy when the session ends).")
+        else:
+            CODE_DETECTION_SECONDS.observe(time.time() - start_time)
+            record_step("web_code", time.time() - start_time)
+            # Code was found! Keep browser open during phone entry and 5-min wait
+            print(f"\n✅ Linking code detected: {code}")
+            print("📲 Returning to phone entry...")
+            print("🌐 Browser will stay open during linking process...")
+        
+        return code  # Return code - browser will stay open for linking
+
+    except Exception as e:
+        print(f"⚠️ Playwright Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+    finally:
+        # Browser stays open after function returns - will be closed in main function after 5-min wait
+        pass
+
+# Renamed/Replaces get_code_with_pyppeteer
+def get_code_from_browser(session_dir, phone_number, debug=None, playwright=None, hold_open=True, state=None):
+    return open_with_playwright("https://web.whatsapp.com", session_dir, phone_number,
+                                debug=debug, playwright=playwright, hold_open=hold_open, state=state)
+
+
+def close_browser_context(state=None):
+    """Close the browser context that was kept open after code extraction."""
+    state = state or _default_state()
+    context, browser, playwright = state.context, state.browser, state.playwright
+    if context is not None:
+        _track_live(-1)
+    try:
+        if context:
+            context.close()
+            print("✅ Browser closed")
+        if browser is not None and browser is not context:
+            browser.close()  # regular-launch fallback: context.close() leaves Chromium running
+    except Exception:
+        pass
+    try:
+        if playwright:
+            playwright.stop()  # browser close fail ho tab bhi driver band
+    except Exception:
+        pass
+    state.context = None
+    state.browser = None
+    state.playwright = None
+    state.page = None
+    state.user_data_dir = None
+    state.rss_marker = None
+    state.root_pid = None
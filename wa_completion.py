@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+
+from wa_android import linked_devices_baseline, phone_link_confirmed
+
+# =================================================
+# LINK COMPLETION WATCHER (BROWSER vs PHONE RACE)
+# =================================================
+# Code enter hone ke baad browser (chat list markers) aur phone (pairing
+# screen band / Linked devices list wapas) dono ko race karta hai; jo pehle
+# confirm kare, wait wahi khatam ho jata hai. Phone pehle jeete to browser ko
+# WA_LINK_GRACE (15s) tak chat list load karne dete hain - turant band karne
+# se web session adhoora reh sakta hai.
+DEFAULT_GRACE = 15
+_BROWSER_LOGIN_JS = """
+() => !!(document.querySelector('#pane-side')
+      || document.querySelector("[data-testid='chat-list']")
+      || document.querySelector("div[role='textbox']"))
+"""
+
+
+def browser_logged_in(page):
+    """Login markers ek hi evaluate me check karta hai."""
+    if page is None:
+        return False
+    try:
+        return not page.is_closed() and bool(page.evaluate(_BROWSER_LOGIN_JS))
+    except Exception:
+        return False
+
+
+def wait_for_link_completion(page, device=None, package=None, timeout=300, poll=0.5, phone_poll=1.0,
+                             grace=None, user_id=None):
+    """Returns "browser", "phone" ya None (timeout).
+
+    Playwright sync API thread-safe nahi hai, isliye browser check caller
+    thread pe hota hai; phone (uiautomator2 over HTTP) background thread pe.
+    `grace` = phone jeete to browser ka wait (None = WA_LINK_GRACE / 15s).
+    Phone side us instance (package + `user_id`) ke linked-devices baseline se
+    confirm hota hai; baseline na ho to sirf browser.
+    """
+    done = threading.Event()
+    winner = []
+
+    def confirm(by):
+        if not done.is_set():
+            winner.append(by)
+            done.set()
+
+    def phone_watch():
+        while not done.is_set():
+            if phone_link_confirmed(device, package, user_id=user_id):
+                confirm("phone")
+                return
+            done.wait(phone_poll)
+
+    if device is not None and package and linked_devices_baseline(device, package, user_id) is None:
+        print("⚠️ Linked devices were not counted before code entry - phone-side confirmation off")
+    elif device is not None and package:
+        threading.Thread(target=phone_watch, name="phone-link-watch", daemon=True).start()
+
+    start = time.time()
+    last_shown = None
+    try:
+        while not done.is_set():
+            remaining = int(timeout - (time.time() - start))
+            if remaining <= 0:
+                break
+            if remaining != last_shown and (remaining % 30 == 0 or remaining <= 10):
+                print(f"  ⏱️ {remaining}s remaining...")
+                last_shown = remaining
+            if page is not None and browser_logged_in(page):
+                confirm("browser")
+                break
+            done.wait(poll)
+    finally:
+        done.set()  # stop the phone watcher
+
+    if winner:
+        print(f"✅ Link confirmed by {winner[0]} after {time.time() - start:.1f}s")
+        if winner[0] == "phone" and page is not None and grace != 0:
+            browser_grace(page, grace)
+        return winner[0]
+    return None
+
+
+def browser_grace(page, grace=None, poll=0.5):
+    """Phone confirm ke baad browser ke login markers ka thoda intezaar."""
+    if grace is None:
+        grace = float(os.environ.get("WA_LINK_GRACE") or DEFAULT_GRACE)
+    end = time.time() + grace
+    while time.time() < end:
+        if browser_logged_in(page):
+            print("✅ Browser session loaded")
+            return True
+        time.sleep(poll)
+    print(f"⚠️ Browser did not show the chat list within {grace:.0f}s of the phone confirmation")
+    return False
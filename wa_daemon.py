@@ -0,0 +1,302 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from wa_browser import PLAYWRIGHT_AVAILABLE, live_browsers, start_playwright
+from wa_debug import DebugArtifacts
+from wa_fleet import connect_device, find_whatsapp_instances, healthy_devices, instance_label
+from wa_log import start_logging
+from wa_metrics import render as render_metrics, start_metrics_exporter
+from wa_retry import breakers, device_breaker
+from wa_session import LinkSession
+
+# =================================================
+# LINK DAEMON (WARM DEVICES + PLAYWRIGHT, LOCAL JOB API)
+# =================================================
+# Ek process me har device ka worker thread apna uiautomator2 connection aur
+# apna Playwright driver (sync API thread-bound hai) warm rakhta hai; har job
+# me sirf WhatsApp-specific steps chalte hain.
+#
+#   POST /jobs        {"profile": "C1_M1", "phone": "9198...", "instance": 1, "serial": "...",
+#                      optional "timeout", "launch_mode" (warm/cold), "debug" (off/on-failure/always)}
+#   GET  /jobs/<id>   job status + step timings + browser RSS per phase
+#   GET  /jobs        saare jobs
+#   GET  /devices     workers, instances, queue lengths, circuit state
+#   GET  /breakers    saare circuit breakers (device:<serial>, web:<host>)
+#   GET  /metrics     Prometheus text format (wa_metrics)
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+JOB_FINAL_STATES = ("linked", "logged_in", "no_code", "failed", "timeout")
+
+
+class DeviceWorker:
+    """Ek phone ka worker: warm u2 connection + warm Playwright driver + job queue."""
+
+    def __init__(self, serial):
+        self.serial = serial
+        self.device = None
+        self.instances = []
+        self.playwright = None
+        self.jobs = queue.Queue()
+        self.current = None
+        self.ready = threading.Event()
+        self.error = None
+        self.breaker = device_breaker(serial)
+        self.reroute = None  # LinkDaemon set karta hai: circuit open ho to job dusre device pe
+        self.thread = threading.Thread(target=self._run, name=f"link-{serial}", daemon=True)
+
+    def load(self):
+        return self.jobs.qsize() + (1 if self.current else 0)
+
+    def _warm_up(self):
+        t0 = time.time()
+        self.device = connect_device(self.serial)
+        self.device.screen_on()
+        self.device.unlock()
+        self.instances = find_whatsapp_instances(self.serial)
+        if PLAYWRIGHT_AVAILABLE:
+            self.playwright = start_playwright()
+        print(f"🔥 [{self.serial}] Warm in {time.time() - t0:.1f}s "
+              f"({', '.join(instance_label(p, u) for p, u in self.instances) or 'no WhatsApp'})")
+
+    def _run(self):
+        try:
+            self._warm_up()
+        except Exception as e:
+            self.error = str(e)
+            print(f"❌ [{self.serial}] Warm-up failed: {e}")
+        finally:
+            self.ready.set()
+
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            if not self.error and not self.breaker.allow():
+                if self.reroute and self.reroute(job, self):
+                    continue
+                job["status"] = "failed"
+                job["error"] = f"{self.breaker.key} circuit open (retry in {self.breaker.retry_in():.0f}s)"
+                job["finished_at"] = time.time()
+                print(f"🔌 [{self.serial}] Job {job['id']} skipped: {job['error']}")
+                continue
+            self.current = job
+            try:
+                if self.error:
+                    raise RuntimeError(f"device not ready: {self.error}")
+                run_link_job(self, job)
+                self.breaker.success()
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                print(f"❌ [{self.serial}] Job {job['id']} failed: {e}")
+                if not self.error:
+                    self.breaker.failure()
+            finally:
+                job["finished_at"] = time.time()
+                self.current = None
+
+        if self.playwright:
+            try:
+                self.playwright.stop()
+            except Exception:
+                pass
+
+
+def run_link_job(worker, job):
+    """Single link job on an already-warm worker (device + Playwright driver)."""
+    job["status"] = "running"
+    job["started_at"] = time.time()
+
+    index = int(job.get("instance") or 1)
+    if not 1 <= index <= len(worker.instances):
+        raise ValueError(f"instance {index} not available on {worker.serial}")
+    package, user_id = worker.instances[index - 1]
+    job["package"], job["user_id"] = package, user_id
+
+    warm = {"warm": True, "cold": False}.get(job.get("launch_mode"))
+    session = LinkSession(job["profile"], job.get("phone"), serial=worker.serial, device=worker.device,
+                          package=package, user_id=user_id, playwright=worker.playwright,
+                          debug=DebugArtifacts(job["profile"], level=job.get("debug"), run_tag=job["id"]),
+                          warm=warm,
+                          session_id=job["id"])
+    job["timings"] = session.timings
+    job["rss_mb"] = session.browser.rss
+    try:
+        timeout = job.get("timeout")
+        job["status"] = session.run(timeout=int(timeout) if timeout else None)  # None = adaptive
+        job["code"] = session.code
+        job["confirmed_by"] = session.confirmed_by
+    finally:
+        session.close()
+
+
+class LinkDaemon:
+    def __init__(self, serials=None):
+        self.workers = {s: DeviceWorker(s) for s in (serials or healthy_devices())}
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def _available(self, exclude=None):
+        return [w for w in self.workers.values() if w is not exclude and not w.error and not w.breaker.is_open()]
+
+    def _reroute(self, job, worker):
+        """Circuit-open device se unpinned job ko sabse kam loaded healthy device pe bhejta hai."""
+        others = self._available(exclude=worker)
+        if job.get("pinned") or not others:
+            return False
+        target = min(others, key=lambda w: w.load())
+        print(f"🔀 Job {job['id']} rerouted {worker.serial} -> {target.serial} ({worker.breaker.key} open)")
+        job.setdefault("rerouted_from", []).append(worker.serial)
+        job["serial"] = target.serial
+        target.jobs.put(job)
+        return True
+
+    def start(self):
+        if not self.workers:
+            raise SystemExit("❌ No healthy Android device found (adb devices)")
+        for w in self.workers.values():
+            w.reroute = self._reroute
+            w.thread.start()
+        for w in self.workers.values():
+            w.ready.wait()
+
+    def stop(self):
+        for w in self.workers.values():
+            w.jobs.put(None)
+        for w in self.workers.values():
+            w.thread.join(timeout=30)
+
+    def submit(self, payload):
+        if not payload.get("profile"):
+            raise ValueError("'profile' is required")
+        serial = payload.get("serial")
+        if serial:
+            worker = self.workers.get(serial)
+            if worker is None:
+                raise ValueError(f"unknown device {serial}")
+        else:
+            healthy = self._available() or [w for w in self.workers.values() if not w.error]
+            if not healthy:
+                raise ValueError("no healthy device")
+            worker = min(healthy, key=lambda w: w.load())
+
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "profile": payload["profile"],
+            "phone": payload.get("phone"),
+            "instance": payload.get("instance") or 1,
+            "timeout": payload.get("timeout"),
+            "launch_mode": payload.get("launch_mode"),
+            "debug": payload.get("debug"),
+            "serial": worker.serial,
+            "pinned": bool(serial),
+            "status": "queued",
+            "submitted_at": time.time(),
+            "timings": {},
+        }
+        with self._lock:
+            self.jobs[job["id"]] = job
+        worker.jobs.put(job)
+        return job
+
+    def wait_all(self, poll=1.0):
+        """Block until every submitted job is in a final state."""
+        while any(j["status"] not in JOB_FINAL_STATES for j in self.list_jobs()):
+            time.sleep(poll)
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._lock:
+            return list(self.jobs.values())
+
+    def devices(self):
+        return [{
+            "serial": w.serial,
+            "ready": w.ready.is_set() and not w.error,
+            "error": w.error,
+            "circuit": w.breaker.state,
+            "instances": [instance_label(p, u) for p, u in w.instances],
+            "queued": w.jobs.qsize(),
+            "current": w.current["id"] if w.current else None,
+        } for w in self.workers.values()]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    daemon = None  # set by serve()
+
+    def _send(self, status, body):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if parts == ["devices"]:
+            return self._send(200, self.daemon.devices())
+        if parts == ["jobs"]:
+            return self._send(200, self.daemon.list_jobs())
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.daemon.get(parts[1])
+            return self._send(200, job) if job else self._send(404, {"error": "job not found"})
+        if parts == ["breakers"]:
+            return self._send(200, breakers())
+        if parts == ["health"]:
+            return self._send(200, {"ok": True, "live_browsers": live_browsers()})
+        if parts == ["metrics"]:
+            data = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            return self.wfile.write(data)
+        self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            job = self.daemon.submit(payload)
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+        self._send(202, job)
+
+    def log_message(self, fmt, *args):
+        pass  # keep console for job output
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, serials=None):
+    start_logging()
+    daemon = LinkDaemon(serials)
+    start_metrics_exporter()
+    print("🚀 Starting link daemon (warming devices + Playwright)...")
+    daemon.start()
+    _Handler.daemon = daemon
+    server = ThreadingHTTPServer((host, port), _Handler)
+    print(f"✅ Link daemon listening on http://{host}:{port} ({len(daemon.workers)} device(s))")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping link daemon...")
+    finally:
+        server.server_close()
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.environ.get("WA_DAEMON_PORT") or DEFAULT_PORT)
+    serve(os.environ.get("WA_DAEMON_HOST") or DEFAULT_HOST, port)
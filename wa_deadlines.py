@@ -0,0 +1,144 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# =================================================
+# ADAPTIVE DEADLINES (STEP DURATION HISTORY)
+# =================================================
+# Har wait ka observed duration (per step, per device / instance) yaad rakha
+# jata hai; agli baar deadline = p95 * margin, floor aur 2x default ke beech.
+# History kam ho (< MIN_SAMPLES) ya haal me (last 3 runs) timeout hua ho to purana
+# fixed default hi chalta hai. WA_DEADLINES=fixed = hamesha defaults.
+#
+# File format (step -> scope -> last samples; null = timeout):
+# {"web_code": {"*": [6.1, 7.4, null], "R58M123ABC": [6.1, 7.4]}}
+DEFAULT_HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "step_history.json")
+ALL = "*"
+KEEP_SAMPLES = 50
+MIN_SAMPLES = 5
+RECENT = 3  # in last runs me koi timeout ho to default (history censored hai)
+PERCENTILE = 0.95
+MARGIN = 1.5
+MAX_FACTOR = 2.0
+SAVE_INTERVAL = 5
+
+# Deadline kabhi isse kam nahi (seconds); "click:menu" jaise steps prefix se match
+FLOORS = {
+    "web_code": 15,
+    "login": 60,
+    "chooser": 2,
+    "whatsapp_ready": 5,
+    "click": 3,
+    "browser_launch": 20,
+}
+
+
+def instance_scope(device, package=None, user_id=None):
+    """Device serial (aur package/user diya ho to instance) - history scope."""
+    serial = getattr(device, "serial", None) or "default"
+    return f"{serial}/{package}:{user_id}" if package else serial
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    k = (len(values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+class StepHistory:
+    """JSON-file backed per-step duration samples."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("WA_STEP_HISTORY") or DEFAULT_HISTORY_PATH
+        self._lock = threading.Lock()
+        self._data = None
+        self._dirty = False
+        self._saved_at = 0.0
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+                if not isinstance(self._data, dict):
+                    self._data = {}
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._data, sort_keys=True)
+            self._dirty = False
+            self._saved_at = time.time()
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️ Could not save step history: {e}")
+
+    def record(self, step, seconds, scope=None):
+        """Successful duration (seconds) ya timeout (None) record karta hai."""
+        value = None if seconds is None else round(seconds, 2)
+        with self._lock:
+            steps = self._load().setdefault(step, {})
+            for key in {ALL, scope or ALL}:
+                samples = steps.setdefault(key, [])
+                samples.append(value)
+                del samples[:-KEEP_SAMPLES]
+            self._dirty = True
+            due = time.time() - self._saved_at > SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def samples(self, step, scope=None):
+        with self._lock:
+            steps = self._load().get(step, {})
+            own = list(steps.get(scope or ALL, []))
+            if None in own[-RECENT:] or len([s for s in own if s is not None]) >= MIN_SAMPLES:
+                return own
+            return list(steps.get(ALL, []))
+
+    def deadline(self, step, default, scope=None):
+        """History se deadline (seconds); data kam / haal me timeout -> default."""
+        if (os.environ.get("WA_DEADLINES") or "").lower() == "fixed":
+            return default
+        samples = self.samples(step, scope)
+        ok = [s for s in samples if s is not None]
+        if not samples or None in samples[-RECENT:] or len(ok) < MIN_SAMPLES:
+            return default
+        floor = FLOORS.get(step.split(":")[0], 1)
+        p95 = percentile(ok, PERCENTILE)
+        value = round(min(max(p95 * MARGIN, floor), default * MAX_FACTOR), 1)
+        if value != default:
+            print(f"⏱️ {step} deadline {value:.1f}s (p95 {p95:.1f}s over {len(ok)} runs, default {default}s)")
+        return value
+
+
+_HISTORY = None
+
+
+def get_step_history():
+    global _HISTORY
+    if _HISTORY is None:
+        _HISTORY = StepHistory()
+        atexit.register(_HISTORY.save)
+    return _HISTORY
+
+
+def deadline(step, default, scope=None):
+    return get_step_history().deadline(step, default, scope)
+
+
+def record_step(step, seconds, scope=None):
+    get_step_history().record(step, seconds, scope)
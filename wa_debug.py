@@ -0,0 +1,200 @@
+import atexit
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+
+# =================================================
+# DEBUG ARTIFACT CAPTURE (OFF THE HOT PATH)
+# =================================================
+# Levels:
+#   off        -> kuch bhi save nahi hota
+#   on-failure -> sirf failure pe (code timeout, interrupt) artifacts save hote hain
+#   always     -> har phase ke artifacts save hote hain (old behaviour)
+DEBUG_OFF = "off"
+DEBUG_ON_FAILURE = "on-failure"
+DEBUG_ALWAYS = "always"
+DEBUG_LEVELS = (DEBUG_OFF, DEBUG_ON_FAILURE, DEBUG_ALWAYS)
+
+DEFAULT_DEBUG_LEVEL = DEBUG_ON_FAILURE
+DEFAULT_KEEP_RUNS = 10
+# Rotation in run dirs ko nahi chhuti: is process ke open runs, aur haal me
+# (ACTIVE_RUN_SECONDS ke andar) badli dirs - dusre process ka same profile session
+ACTIVE_RUN_SECONDS = 600
+_ACTIVE_RUN_DIRS = set()
+DEFAULT_DEBUG_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "debug_artifacts")
+
+
+def get_debug_level(value=None):
+    """Debug level resolve karta hai (argument > WA_DEBUG env > default)."""
+    level = (value or os.environ.get("WA_DEBUG") or DEFAULT_DEBUG_LEVEL).strip().lower()
+    if level not in DEBUG_LEVELS:
+        print(f"⚠️ Unknown debug level '{level}', using '{DEFAULT_DEBUG_LEVEL}'")
+        level = DEFAULT_DEBUG_LEVEL
+    return level
+
+
+def _safe_name(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name or "default")
+
+
+class DebugArtifacts:
+    """Per-profile, per-run debug artifacts.
+
+    Page se data (HTML, screenshot bytes, text) caller thread pe liya jata hai
+    kyunki Playwright sync API thread-safe nahi hai; disk writes, directory
+    creation aur rotation ek background worker thread karta hai.
+    Run directory tabhi banti hai jab pehla artifact likha jaye, isliye
+    successful on-failure runs pe koi disk I/O nahi hota.
+    """
+
+    def __init__(self, profile, level=None, root=None, keep_runs=None, run_tag=None):
+        self.profile = _safe_name(profile)
+        self.level = get_debug_level(level)
+        self.root = root or os.environ.get("WA_DEBUG_DIR") or DEFAULT_DEBUG_ROOT
+        try:
+            self.keep_runs = int(keep_runs or os.environ.get("WA_DEBUG_KEEP") or DEFAULT_KEEP_RUNS)
+        except ValueError:
+            self.keep_runs = DEFAULT_KEEP_RUNS
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        if run_tag:
+            run_id += f"-{_safe_name(run_tag)}"  # ek process me same profile ke kai runs (daemon jobs)
+        self.run_tag = _safe_name(run_tag) if run_tag else None
+        self.run_dir = os.path.join(self.root, self.profile, run_id)
+        self._queue = None
+        self._worker = None
+        self._lock = threading.Lock()
+        self._dir_ready = False
+        self._atexit_registered = False
+        self.saved = []
+
+    # -------------------------------------------------
+    # Level checks
+    # -------------------------------------------------
+    @property
+    def enabled(self):
+        return self.level != DEBUG_OFF
+
+    def wants(self, failure=False):
+        """True agar is phase ke artifacts save hone chahiye."""
+        if self.level == DEBUG_ALWAYS:
+            return True
+        return failure and self.level == DEBUG_ON_FAILURE
+
+    # -------------------------------------------------
+    # Capture API (caller thread)
+    # -------------------------------------------------
+    def capture_page(self, page, label, html=True, screenshot=True, text=None, failure=False):
+        """Page ka HTML/screenshot (aur optional text) background me save karta hai."""
+        if not self.wants(failure):
+            return False
+        if html:
+            try:
+                self._enqueue(f"{label}.html", page.content())
+            except Exception as e:
+                print(f"⚠️ Could not capture HTML ({label}): {e}")
+        if screenshot:
+            try:
+                self._enqueue(f"{label}.png", page.screenshot())
+            except Exception as e:
+                print(f"⚠️ Could not capture screenshot ({label}): {e}")
+        if text is not None:
+            self._enqueue(f"{label}.txt", text)
+        return True
+
+    def capture_screenshot(self, page, label, failure=False):
+        return self.capture_page(page, label, html=False, screenshot=True, failure=failure)
+
+    def save_text(self, label, text, failure=False):
+        if not self.wants(failure) or text is None:
+            return False
+        self._enqueue(f"{label}.txt", text)
+        return True
+
+    # -------------------------------------------------
+    # Background worker
+    # -------------------------------------------------
+    def _enqueue(self, filename, data):
+        with self._lock:
+            if self._worker is None:
+                self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, name=f"debug-{self.profile}", daemon=True)
+                self._worker.start()
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+        self._queue.put((filename, data))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                print(f"⚠️ Debug artifact write failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, filename, data):
+        if not self._dir_ready:
+            os.makedirs(self.run_dir, exist_ok=True)
+            self._dir_ready = True
+            _ACTIVE_RUN_DIRS.add(self.run_dir)
+            self._rotate()
+        path = os.path.join(self.run_dir, filename)
+        if isinstance(data, bytes):
+            with open(path, "wb") as f:
+                f.write(data)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(data)
+        self.saved.append(path)
+
+    def _in_use(self, path):
+        """Concurrent session (daemon / fleet me same profile) ki dir? Usko delete nahi karna."""
+        if path == self.run_dir or path in _ACTIVE_RUN_DIRS:
+            return True
+        if self.run_tag and path.endswith(f"-{self.run_tag}"):
+            return True
+        try:
+            return time.time() - os.path.getmtime(path) < ACTIVE_RUN_SECONDS
+        except OSError:
+            return True  # abhi-abhi hati / access nahi - chhod do
+
+    def _rotate(self):
+        """Profile ke purane run directories delete karta hai (latest keep_runs rakhta hai)."""
+        profile_dir = os.path.dirname(self.run_dir)
+        try:
+            runs = sorted(
+                os.path.join(profile_dir, n) for n in os.listdir(profile_dir)
+                if os.path.isdir(os.path.join(profile_dir, n))
+            )
+        except OSError:
+            return
+        for old in runs[:max(0, len(runs) - self.keep_runs)]:
+            if not self._in_use(old):
+                shutil.rmtree(old, ignore_errors=True)
+
+    def flush(self):
+        """Pending writes complete hone tak wait karta hai."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        """Pending writes khatam karke worker thread band (atexit entry bhi hatata hai)."""
+        with self._lock:
+            worker, self._worker = self._worker, None
+            if self._atexit_registered:
+                atexit.unregister(self.close)
+                self._atexit_registered = False
+        if worker is None:
+            return
+        self._queue.put(None)
+        worker.join(timeout=10)
+        _ACTIVE_RUN_DIRS.discard(self.run_dir)
+        if self.saved:
+            print(f"📁 Debug artifacts saved in: {self.run_dir}")
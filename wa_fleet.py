@@ -0,0 +1,330 @@
+import json
+import os
+import queue
+import re
+import subprocess
+import sys
+import threading
+import time
+
+# =================================================
+# FLEET: SERIAL-AWARE ADB + MULTI-DEVICE SCHEDULER
+# =================================================
+# Har adb command `-s <serial>` ke saath chalta hai aur har phone ka apna
+# uiautomator2 connection hota hai, taaki ek host pe kai phones chal sakein.
+PACKAGES = ["com.whatsapp", "com.whatsapp.w4b"]
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_JOB_TIMEOUT = 15 * 60
+
+
+def adb_cmd(serial, *args):
+    cmd = ["adb"]
+    if serial:
+        cmd += ["-s", serial]
+    return cmd + [str(a) for a in args]
+
+
+def adb_output(serial, *args, **kwargs):
+    return subprocess.check_output(adb_cmd(serial, *args), universal_newlines=True, **kwargs)
+
+
+# =================================================
+# DEVICE DISCOVERY
+# =================================================
+def list_devices():
+    """`adb devices` parse karta hai. Returns [(serial, state), ...]."""
+    try:
+        out = subprocess.check_output(["adb", "devices"], universal_newlines=True)
+    except Exception as e:
+        print(f"⚠️ adb devices failed: {e}")
+        return []
+    devices = []
+    for line in out.splitlines()[1:]:
+        parts = line.split()
+        if len(parts) >= 2:
+            devices.append((parts[0], parts[1]))
+    return devices
+
+
+def healthy_devices():
+    """Sirf 'device' state wale serials (offline / unauthorized skip)."""
+    return [serial for serial, state in list_devices() if state == "device"]
+
+
+def device_healthy(serial):
+    try:
+        return adb_output(serial, "get-state", stderr=subprocess.DEVNULL).strip() == "device"
+    except Exception:
+        return False
+
+
+def pick_serial():
+    """ANDROID_SERIAL env > single attached device > user choice."""
+    serial = os.environ.get("ANDROID_SERIAL")
+    if serial:
+        print(f"📱 Using device from ANDROID_SERIAL: {serial}")
+        return serial
+
+    serials = healthy_devices()
+    if not serials:
+        raise SystemExit("❌ No healthy Android device found (adb devices)")
+    if len(serials) == 1:
+        return serials[0]
+
+    print("\n📱 Devices found:\n")
+    for i, s in enumerate(serials, start=1):
+        print(f"{i}. {s}")
+    try:
+        choice = int(input("\n👉 Select device: ").strip() or 1)
+    except Exception:
+        choice = 1
+    if not 1 <= choice <= len(serials):
+        print("⚠️ Invalid choice, defaulting to 1")
+        choice = 1
+    return serials[choice - 1]
+
+
+def connect_device(serial=None):
+    """Per-serial uiautomator2 connection."""
+    import uiautomator2 as u2
+    return u2.connect(serial) if serial else u2.connect()
+
+
+# =================================================
+# ANDROID USERS + WHATSAPP INSTANCES (PER SERIAL)
+# =================================================
+def get_android_users(serial=None):
+    out = adb_output(serial, "shell", "pm", "list", "users")
+    users = []
+    for line in out.splitlines():
+        m = re.search(r'UserInfo\{(\d+):', line)
+        if m:
+            users.append(int(m.group(1)))
+    return users
+
+
+def find_whatsapp_instances(serial=None):
+    """[(package, user_id), ...] - normal, dual (user 999) aur Business."""
+    instances = []
+    users = get_android_users(serial)
+    for pkg in PACKAGES:
+        for user in users:
+            try:
+                adb_output(serial, "shell", "pm", "path", "--user", user, pkg, stderr=subprocess.DEVNULL)
+                instances.append((pkg, user))
+            except subprocess.CalledProcessError:
+                pass
+    return instances
+
+
+def instance_label(pkg, user):
+    if pkg == "com.whatsapp" and user == 0:
+        return "WhatsApp (Normal)"
+    elif pkg == "com.whatsapp" and user != 0:
+        return f"WhatsApp Dual (user {user})"
+    elif pkg == "com.whatsapp.w4b":
+        return "WhatsApp Business"
+    return f"{pkg} (user {user})"
+
+
+# =================================================
+# SCHEDULER
+# =================================================
+class DeviceStats:
+    def __init__(self):
+        self.done = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.started = None
+
+    def throughput_per_hour(self):
+        if not self.started:
+            return 0.0
+        elapsed = time.time() - self.started
+        return (self.done * 3600 / elapsed) if elapsed > 0 else 0.0
+
+
+class FleetScheduler:
+    """Link jobs ko saare healthy devices (aur unke WhatsApp instances) pe spread karta hai.
+
+    Har device ka ek worker thread hota hai (ek phone pe ek waqt me ek UI flow).
+    Job dict me optional "serial" (pin to device) aur "instance" (1-based
+    index) ho sakta hai; warna instances round-robin me milte hain.
+    `run_job(serial, instance_index, job)` True/False return karta hai.
+    """
+
+    def __init__(self, run_job, serials=None):
+        self.run_job = run_job
+        self.serials = list(serials) if serials else healthy_devices()
+        self.instances = {}
+        self.stats = {s: DeviceStats() for s in self.serials}
+        self.shared = queue.Queue()
+        self.pinned = {s: queue.Queue() for s in self.serials}
+        self.results = []
+        self._lock = threading.Lock()
+        self._rr = {s: 0 for s in self.serials}
+
+    def submit(self, job):
+        serial = job.get("serial")
+        if serial:
+            if serial not in self.pinned:
+                # Dusre phone pe wahi instance index = dusra WhatsApp account; reroute nahi
+                self._fail(job, serial, "pinned device unknown / unhealthy")
+            else:
+                self.pinned[serial].put(job)
+        else:
+            self.shared.put(job)
+
+    def _fail(self, job, serial, error):
+        print(f"❌ [{serial}] Pinned job not run: {error}")
+        with self._lock:
+            if serial in self.stats:
+                self.stats[serial].failed += 1
+            self.results.append({"serial": serial, "instance": job.get("instance"), "ok": False,
+                                 "seconds": 0.0, "job": job, "error": error})
+
+    def _next_job(self, serial):
+        for q in (self.pinned[serial], self.shared):
+            try:
+                return q.get_nowait()
+            except queue.Empty:
+                pass
+        return None
+
+    def _pick_instance(self, serial, job):
+        instances = self.instances.get(serial) or []
+        if job.get("instance"):
+            return int(job["instance"])
+        if not instances:
+            return 1
+        idx = self._rr[serial] % len(instances)
+        self._rr[serial] += 1
+        return idx + 1
+
+    def _worker(self, serial):
+        stats = self.stats[serial]
+        stats.started = time.time()
+        while True:
+            job = self._next_job(serial)
+            if job is None:
+                return
+            if not device_healthy(serial):
+                print(f"❌ [{serial}] Device unhealthy, handing unpinned jobs back to the fleet")
+                # Pinned jobs sirf isi device ke liye hain - fail + report, baaki shared queue me
+                pending = [job]
+                while True:
+                    try:
+                        pending.append(self.pinned[serial].get_nowait())
+                    except queue.Empty:
+                        break
+                for j in pending:
+                    if j.get("serial") == serial:
+                        self._fail(j, serial, "device unhealthy")
+                    else:
+                        self.shared.put(j)
+                return
+            instance = self._pick_instance(serial, job)
+            t0 = time.time()
+            try:
+                ok = bool(self.run_job(serial, instance, job))
+            except Exception as e:
+                print(f"⚠️ [{serial}] Job error: {e}")
+                ok = False
+            took = time.time() - t0
+            with self._lock:
+                stats.busy_seconds += took
+                if ok:
+                    stats.done += 1
+                else:
+                    stats.failed += 1
+                self.results.append({"serial": serial, "instance": instance, "ok": ok, "seconds": round(took, 1), "job": job})
+            print(f"{'✅' if ok else '❌'} [{serial}] instance {instance} finished in {took:.1f}s")
+
+    def run(self):
+        if not self.serials:
+            raise SystemExit("❌ No healthy Android device found (adb devices)")
+        for serial in self.serials:
+            try:
+                self.instances[serial] = find_whatsapp_instances(serial)
+            except Exception as e:
+                print(f"⚠️ [{serial}] Could not list WhatsApp instances: {e}")
+                self.instances[serial] = []
+            labels = ", ".join(instance_label(p, u) for p, u in self.instances[serial]) or "none"
+            print(f"📱 {serial}: {labels}")
+
+        threads = [threading.Thread(target=self._worker, args=(s,), name=f"fleet-{s}") for s in self.serials]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.report()
+        return self.results
+
+    def report(self):
+        print("\n" + "=" * 50)
+        print("📊 FLEET THROUGHPUT")
+        for serial, st in self.stats.items():
+            total = st.done + st.failed
+            avg = st.busy_seconds / total if total else 0.0
+            print(f"  {serial}: {st.done} ok / {st.failed} failed, avg {avg:.1f}s/job, "
+                  f"{st.throughput_per_hour():.1f} links/hour")
+        left = self.shared.qsize() + sum(q.qsize() for q in self.pinned.values())
+        if left:
+            print(f"  ⚠️ {left} job(s) not run (no healthy device left)")
+        print("=" * 50)
+
+
+# =================================================
+# JOB RUNNERS (ONE PROCESS PER JOB, ANDROID_SERIAL PER DEVICE)
+# =================================================
+def run_script_job(serial, instance, job, timeout=DEFAULT_JOB_TIMEOUT):
+    """Job ke hisaab se WA_Login_Automator.py (profile + phone) ya
+    wa_phone_pair.py (code) chalata hai, sirf us device pe."""
+    if job.get("code"):
+        cmd = [sys.executable, os.path.join(SCRIPT_DIR, "wa_phone_pair.py"), job["code"], str(instance)]
+    else:
+        cmd = [sys.executable, os.path.join(SCRIPT_DIR, "WA_Login_Automator.py"),
+               job["profile"], str(instance), job.get("phone", "")]
+    env = dict(os.environ, ANDROID_SERIAL=serial, PYTHONIOENCODING="utf-8")
+    try:
+        # ENTERs for the interactive prompts (manual code skip, final exit)
+        proc = subprocess.run(cmd, env=env, input="\n" * 5, universal_newlines=True, timeout=timeout)
+        return proc.returncode == 0
+    except subprocess.TimeoutExpired:
+        print(f"⏱️ [{serial}] Job timed out after {timeout}s")
+        return False
+
+
+def load_jobs(path):
+    """JSONL: {"profile": "C1_M1", "phone": "91...", "instance": 1, "serial": "..."}
+    ya {"code": "ABCD-1234", ...} pairing jobs ke liye."""
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                jobs.append(json.loads(line))
+            except ValueError as e:
+                print(f"⚠️ Skipping line {n}: {e}")
+    return jobs
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("devices", "run"):
+        raise SystemExit("Usage: python wa_fleet.py devices | run <jobs.jsonl>")
+
+    if sys.argv[1] == "devices":
+        for serial, state in list_devices():
+            print(f"{serial}\t{state}")
+            if state == "device":
+                for i, (pkg, user) in enumerate(find_whatsapp_instances(serial), start=1):
+                    print(f"    {i}. {instance_label(pkg, user)}")
+    else:
+        if len(sys.argv) < 3:
+            raise SystemExit("Usage: python wa_fleet.py run <jobs.jsonl>")
+        scheduler = FleetScheduler(run_script_job)
+        for job in load_jobs(sys.argv[2]):
+            scheduler.submit(job)
+        scheduler.run()
@@ -0,0 +1,182 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+# =================================================
+# STRUCTURED PER-SESSION LOGS (JSON LINES, UTF-8)
+# =================================================
+# Console output waisa hi rehta hai; saath me har line ek JSON record ban ke
+# background thread ke through file me jati hai (hot path pe sirf queue.put).
+# LinkSession apna context (session/profile/device/instance) bind karta hai,
+# isliye concurrent sessions ki lines alag files me:
+#   logs/<date>_<profile>_<session>.jsonl   (session context wali lines)
+#   logs/<date>_process_<pid>.jsonl         (baaki sab)
+# WA_LOG_DIR = directory (default "logs"), WA_LOG=off = band.
+DEFAULT_LOG_DIR = "logs"
+CONTEXT_FIELDS = ("session", "profile", "device", "instance")
+
+_CTX = threading.local()
+_QUEUE = queue.SimpleQueue()
+_STOP = object()
+_WRITER = None
+
+
+def _level_of(line):
+    text = line.lstrip()
+    if text.startswith(("❌", "Traceback")):
+        return "error"
+    if text.startswith("⚠️"):
+        return "warning"
+    return "info"
+
+
+def context():
+    """Current thread ka bound context (copy)."""
+    return dict(getattr(_CTX, "fields", None) or {})
+
+
+def bind(**fields):
+    """Current thread pe session fields set karta hai (None values hata deta hai)."""
+    ctx = context()
+    ctx.update({k: v for k, v in fields.items() if v is not None})
+    _CTX.fields = ctx
+    return ctx
+
+
+def unbind():
+    _CTX.fields = {}
+
+
+def log_event(event, level="info", **fields):
+    """Structured event (e.g. session_end + timings) - console pe nahi, sirf log file me."""
+    if _WRITER is None:
+        return
+    _QUEUE.put((time.time(), level, None, event, context(), threading.current_thread().name, fields))
+
+
+class _Tee:
+    """stdout/stderr wrapper: console pe likho, complete lines queue me daalo.
+
+    stderr pe `floor="warning"` - wahan ki info-jaisi lines bhi kam se kam warning.
+    """
+
+    def __init__(self, stream, floor=None):
+        self._stream = stream
+        self._floor = floor
+        self._partial = threading.local()
+
+    def _emit(self, lines):
+        ctx, thread, ts = context(), threading.current_thread().name, time.time()
+        for line in lines:
+            if line.strip():
+                level = _level_of(line)
+                if self._floor and level == "info":
+                    level = self._floor
+                _QUEUE.put((ts, level, line, None, ctx, thread, None))
+
+    def write(self, s):
+        n = self._stream.write(s)
+        if s:
+            buf = getattr(self._partial, "text", "") + s
+            *lines, self._partial.text = buf.split("\n")
+            if lines:
+                self._emit(lines)
+        return n
+
+    def flush(self):
+        # input() prompt flush karta hai - adhoori line bhi record ho jaye
+        partial = getattr(self._partial, "text", "")
+        if partial:
+            self._partial.text = ""
+            self._emit([partial])
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _Writer(threading.Thread):
+    """Background writer: records -> per-session JSONL files (UTF-8)."""
+
+    def __init__(self, log_dir):
+        super().__init__(name="wa-log-writer", daemon=True)
+        self.log_dir = log_dir
+        self.files = {}
+        self.date = datetime.now().strftime("%Y%m%d")
+
+    def _file(self, ctx):
+        key = ctx.get("session") or "process"
+        f = self.files.get(key)
+        if f is None:
+            if key == "process":
+                name = f"{self.date}_process_{os.getpid()}.jsonl"
+            else:
+                name = f"{self.date}_{ctx.get('profile') or 'session'}_{key}.jsonl"
+            f = self.files[key] = open(os.path.join(self.log_dir, name), "a", encoding="utf-8")
+        return key, f
+
+    def run(self):
+        while True:
+            item = _QUEUE.get()
+            if item is _STOP:
+                break
+            ts, level, msg, event, ctx, thread, fields = item
+            record = {"ts": datetime.fromtimestamp(ts).isoformat(timespec="milliseconds"), "level": level}
+            record.update({k: ctx[k] for k in CONTEXT_FIELDS if k in ctx})
+            record["thread"] = thread
+            if event:
+                record["event"] = event
+            if msg is not None:
+                record["msg"] = msg
+            if fields:
+                record.update(fields)
+            try:
+                key, f = self._file(ctx)
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                if event == "session_end":
+                    f.close()
+                    del self.files[key]
+                elif _QUEUE.empty():
+                    f.flush()
+            except OSError:
+                pass
+        for f in self.files.values():
+            f.close()
+
+
+def start_logging():
+    """stdout/stderr tee + background writer start (ek hi baar). WA_LOG=off pe kuch nahi."""
+    global _WRITER
+    if _WRITER is not None or (os.environ.get("WA_LOG") or "").lower() == "off":
+        return
+    log_dir = os.environ.get("WA_LOG_DIR") or DEFAULT_LOG_DIR
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+    except OSError as e:
+        print(f"⚠️ Structured logging disabled: {e}")
+        return
+    _WRITER = _Writer(log_dir)
+    _WRITER.start()
+    sys.stdout = _Tee(sys.stdout)
+    sys.stderr = _Tee(sys.stderr, floor="warning")
+    atexit.register(stop_logging)
+    print(f"📝 Structured logs: {os.path.abspath(log_dir)}")
+
+
+def stop_logging(timeout=5):
+    """Queue drain karke files band (atexit pe bhi)."""
+    global _WRITER
+    writer, _WRITER = _WRITER, None
+    if writer is None:
+        return
+    for name in ("stdout", "stderr"):
+        stream = getattr(sys, name)
+        if isinstance(stream, _Tee):
+            setattr(sys, name, stream._stream)
+    _QUEUE.put(_STOP)
+    writer.join(timeout)
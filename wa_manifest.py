@@ -0,0 +1,200 @@
+import csv
+import os
+import re
+import sys
+import time
+
+from wa_debug import DEBUG_LEVELS
+from wa_fleet import find_whatsapp_instances, healthy_devices
+from wa_log import start_logging
+from wa_metrics import start_metrics_exporter
+from wa_phones import normalize_e164
+
+# =================================================
+# PROFILE MANIFEST (BULK RUNS)
+# =================================================
+# Ek file me saare profiles; pehle poori file validate hoti hai (saare errors
+# ek saath), phir ek hi process me wa_daemon ke warm workers pe sab chalte hain.
+#
+# CSV:   profile,phone,serial,instance,timeout,launch_mode,debug
+#        C1_M1,919876543210,R58M123ABC,1,300,warm,on-failure
+# YAML:  defaults: {instance: 1, launch_mode: warm}
+#        profiles:
+#          - {profile: C1_M1, phone: "919876543210", serial: R58M123ABC}
+#
+# serial khali ho to job kisi bhi healthy device pe (least loaded) jata hai.
+FIELDS = ("profile", "phone", "serial", "instance")
+OVERRIDES = ("timeout", "launch_mode", "debug")
+LAUNCH_MODES = ("warm", "cold")
+
+
+def parse_profile_code(code):
+    """C1_M1 / CR5_R1 style code -> (chrome_profile, machine_number), ya None."""
+    if "R" in code:
+        # Pattern: CR5_R1 type
+        regex = re.compile(r'C([^_]+)_([^\s]+)')
+    else:
+        # Pattern: C138_M7 type
+        regex = re.compile(r'C([^_]+)_M(\d+)')
+    m = regex.match(code)
+    return (m.group(1), m.group(2)) if m else None
+
+
+class ManifestError(ValueError):
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} manifest error(s)")
+        self.errors = errors
+
+
+def _read_csv(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            entry = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+            yield reader.line_num, {k: v for k, v in entry.items() if v != ""}
+
+
+def _read_yaml(path):
+    try:
+        import yaml
+    except ImportError:
+        raise SystemExit("❌ YAML manifest needs PyYAML: pip install pyyaml (ya CSV use karo)")
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    if isinstance(data, list):
+        defaults, profiles = {}, data
+    else:
+        defaults, profiles = data.get("defaults") or {}, data.get("profiles") or []
+    for n, item in enumerate(profiles, start=1):
+        entry = dict(defaults)
+        entry.update(item or {})
+        yield n, {str(k).lower(): v for k, v in entry.items() if v not in (None, "")}
+
+
+def load_manifest(path):
+    """Manifest parse + validate (one pass). Returns list of job dicts, warna ManifestError."""
+    reader = _read_yaml if path.lower().endswith((".yaml", ".yml")) else _read_csv
+    where = "row" if reader is _read_yaml else "line"
+    entries, errors = [], []
+    seen_profiles, seen_phones = {}, {}
+    devices = None
+    instances = {}
+
+    for n, entry in reader(path):
+        def bad(msg):
+            errors.append(f"{where} {n}: {msg}")
+
+        unknown = set(entry) - set(FIELDS) - set(OVERRIDES)
+        if unknown:
+            bad(f"unknown column(s) {', '.join(sorted(unknown))}")
+
+        profile = str(entry.get("profile", ""))
+        if not profile:
+            bad("profile is required")
+        elif not parse_profile_code(profile):
+            bad(f"invalid profile code '{profile}' (expected C<n>_M<n> or CR<n>_R<n>)")
+        elif profile in seen_profiles:
+            bad(f"profile {profile} already listed at {where} {seen_profiles[profile]}")
+        else:
+            seen_profiles[profile] = n
+
+        phone = normalize_e164(str(entry.get("phone", "")))
+        if not phone:
+            bad(f"invalid or missing phone '{entry.get('phone', '')}'")
+        elif phone in seen_phones:
+            bad(f"phone {phone} already listed at {where} {seen_phones[phone]}")
+        else:
+            seen_phones[phone] = n
+
+        try:
+            instance = int(entry.get("instance", 1))
+            if instance < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            bad(f"instance must be a positive number, got '{entry.get('instance')}'")
+            instance = 1
+
+        serial = entry.get("serial")
+        if serial:
+            serial = str(serial)
+            if devices is None:
+                devices = set(healthy_devices())
+            if serial not in devices:
+                bad(f"device {serial} not connected / not healthy")
+            else:
+                if serial not in instances:
+                    instances[serial] = find_whatsapp_instances(serial)
+                if instance > len(instances[serial]):
+                    bad(f"instance {instance} not available on {serial} ({len(instances[serial])} found)")
+
+        timeout = entry.get("timeout")
+        if timeout is not None:
+            try:
+                timeout = int(timeout)
+            except (TypeError, ValueError):
+                bad(f"timeout must be seconds, got '{timeout}'")
+        launch_mode = entry.get("launch_mode")
+        if launch_mode is not None and str(launch_mode).lower() not in LAUNCH_MODES:
+            bad(f"launch_mode must be one of {', '.join(LAUNCH_MODES)}")
+        debug = entry.get("debug")
+        if debug is not None and str(debug).lower() not in DEBUG_LEVELS:
+            bad(f"debug must be one of {', '.join(DEBUG_LEVELS)}")
+
+        entries.append({
+            "profile": profile, "phone": phone, "serial": serial, "instance": instance,
+            "timeout": timeout, "launch_mode": str(launch_mode).lower() if launch_mode else None,
+            "debug": str(debug).lower() if debug else None, "line": n,
+        })
+
+    if not entries and not errors:
+        errors.append("manifest has no profiles")
+    if errors:
+        raise ManifestError(errors)
+    return entries
+
+
+def run_manifest(entries):
+    """Saare entries ek process me (warm device workers) chalata hai. Returns jobs."""
+    from wa_daemon import LinkDaemon  # playwright/u2 sirf run ke waqt
+
+    # Sab pinned hon to sirf wahi devices warm karo, warna saare healthy devices
+    serials = sorted({e["serial"] for e in entries}) if all(e["serial"] for e in entries) else None
+    start_logging()
+    daemon = LinkDaemon(serials)
+    start_metrics_exporter()
+    print(f"🚀 Running {len(entries)} profile(s) on {len(daemon.workers)} device(s)...")
+    t0 = time.time()
+    daemon.start()
+    try:
+        jobs = [daemon.submit(e) for e in entries]
+        daemon.wait_all()
+    finally:
+        daemon.stop()
+
+    print("\n" + "=" * 50)
+    print(f"📊 MANIFEST RUN ({time.time() - t0:.0f}s)")
+    for job in jobs:
+        print(f"  {job['profile']:<12} {job['serial']:<16} {job['status']:<10} {job.get('error') or ''}")
+    counts = {}
+    for job in jobs:
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+    print("  " + ", ".join(f"{k}: {v}" for k, v in sorted(counts.items())))
+    print("=" * 50)
+    return jobs
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or not os.path.exists(sys.argv[1]):
+        raise SystemExit("Usage: python wa_manifest.py <manifest.csv|manifest.yaml> [--check]")
+    try:
+        manifest = load_manifest(sys.argv[1])
+    except ManifestError as e:
+        print(f"❌ {e}:")
+        for err in e.errors:
+            print(f"   - {err}")
+        raise SystemExit(1)
+    print(f"✅ Manifest OK: {len(manifest)} profile(s)")
+    if "--check" not in sys.argv[2:]:
+        jobs = run_manifest(manifest)
+        if any(j["status"] not in ("linked", "logged_in") for j in jobs):
+            raise SystemExit(1)
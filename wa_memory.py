@@ -0,0 +1,103 @@
+import importlib.util
+import os
+
+# =================================================
+# BROWSER PROCESS-TREE RSS (PER SESSION)
+# =================================================
+# Har session ka Chromium apne --user-data-dir se pehchana jata hai; us main
+# process + saare children (renderer, GPU, utility) ka RSS jod ke sessions-per-GB
+# nikalte hain. psutil ho to woh (Windows/macOS/Linux), warna Linux /proc;
+# dono na hon to measurement skip (None).
+PSUTIL_AVAILABLE = importlib.util.find_spec("psutil") is not None
+_HINT_SHOWN = False
+
+
+def _proc_table():
+    """Linux /proc: {pid: (ppid, cmdline, rss_bytes)}."""
+    page = os.sysconf("SC_PAGE_SIZE")
+    table = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "rb") as f:
+                stat = f.read().decode("utf-8", "replace")
+            with open(f"/proc/{name}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode("utf-8", "replace")
+        except OSError:
+            continue
+        # comm me space / ")" ho sakte hain - last ")" ke baad fields
+        fields = stat[stat.rfind(")") + 2:].split()
+        table[int(name)] = (int(fields[1]), cmdline, int(fields[21]) * page)
+    return table
+
+
+def _tree_rss_proc(marker, root_pid=None):
+    table = _proc_table()
+    if root_pid not in table:
+        roots = [pid for pid, (ppid, cmd, _) in table.items()
+                 if marker in cmd and (table.get(ppid) is None or marker not in table[ppid][1])]
+        if not roots:
+            return None, None, 0
+        root_pid = roots[0]
+    children = {}
+    for pid, (ppid, _, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    tree, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return root_pid, sum(table[p][2] for p in tree), len(tree)
+
+
+def _tree_rss_psutil(marker, root_pid=None):
+    import psutil
+    root = None
+    if root_pid:
+        try:
+            root = psutil.Process(root_pid)
+        except psutil.Error:
+            root = None
+    if root is None:
+        for proc in psutil.process_iter(["cmdline"]):
+            cmd = " ".join(proc.info["cmdline"] or [])
+            if marker in cmd and "--type=" not in cmd:  # browser main process, renderer nahi
+                root = proc
+                break
+        if root is None:
+            return None, None, 0
+    total, count = 0, 0
+    for proc in [root] + root.children(recursive=True):
+        try:
+            total += proc.memory_info().rss
+            count += 1
+        except psutil.Error:
+            pass
+    return root.pid, total, count
+
+
+def browser_tree_rss(user_data_dir, root_pid=None, marker=None):
+    """Chromium (is user-data-dir wala) process tree ka RSS.
+
+    `marker` = main process ki command line ka koi aur unique arg (regular launch
+    me user-data-dir Playwright ka temp dir hota hai, isliye apna tag switch).
+    Returns (root_pid, rss_bytes, process_count); na mile / measure na ho sake to
+    (None, None, 0). `root_pid` pichli call ka pid hai (dobara scan na karna pade).
+    """
+    global _HINT_SHOWN
+    if not marker:
+        if not user_data_dir:
+            return None, None, 0
+        marker = f"--user-data-dir={user_data_dir}"
+    try:
+        if PSUTIL_AVAILABLE:
+            return _tree_rss_psutil(marker, root_pid)
+        if os.path.isdir("/proc"):
+            return _tree_rss_proc(marker, root_pid)
+    except Exception:
+        return None, None, 0
+    if not _HINT_SHOWN:
+        _HINT_SHOWN = True
+        print("ℹ️ Browser RSS accounting needs psutil on this OS: pip install psutil")
+    return None, None, 0
@@ -0,0 +1,216 @@
+import atexit
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# =================================================
+# PROMETHEUS-STYLE METRICS (NO EXTRA DEPENDENCY)
+# =================================================
+# Counters / gauges / histograms process me jama hote hain aur Prometheus
+# text format me export hote hain:
+#   WA_METRICS_PORT=9464            -> http://127.0.0.1:9464/metrics
+#   WA_METRICS_TEXTFILE=/path/wa.prom -> node_exporter textfile collector (har 10s + exit pe)
+# wa_daemon apne API pe bhi GET /metrics serve karta hai.
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 45, 60, 120, 300)
+TEXTFILE_INTERVAL = 10
+
+_LOCK = threading.Lock()
+_METRICS = []
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, doc, labelnames=()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        with _LOCK:
+            _METRICS.append(self)
+
+    def _key(self, labels):
+        return tuple((n, labels.get(n, "")) for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        with _LOCK:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_one(key, value))
+        return lines
+
+    def _render_one(self, key, value):
+        return [f"{self.name}{_fmt_labels(key)} {value:g}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _LOCK:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _LOCK:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with _LOCK:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _LOCK:
+            counts, total, n = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, le in enumerate(self.buckets):
+                if value <= le:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, n + 1)
+
+    def time(self, **labels):
+        """`with hist.time(step="x"):` - block ka duration observe karta hai."""
+        return _Timer(self, labels)
+
+    def _render_one(self, key, value):
+        counts, total, n = value
+        lines = []
+        for le, c in zip(self.buckets, counts):
+            lines.append(f"{self.name}_bucket{_fmt_labels(key + (('le', f'{le:g}'),))} {c}")
+        lines.append(f"{self.name}_bucket{_fmt_labels(key + (('le', '+Inf'),))} {n}")
+        lines.append(f"{self.name}_sum{_fmt_labels(key)} {total:g}")
+        lines.append(f"{self.name}_count{_fmt_labels(key)} {n}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, hist, labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.time() - self.t0, **self.labels)
+
+
+def render():
+    """Saare metrics Prometheus text exposition format me."""
+    with _LOCK:
+        metrics = list(_METRICS)
+    lines = []
+    for m in metrics:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# =================================================
+# LINK METRICS
+# =================================================
+LINKS_ATTEMPTED = Counter("wa_links_attempted_total", "Link sessions started")
+LINKS_SUCCEEDED = Counter("wa_links_succeeded_total", "Link sessions that ended linked or already logged in",
+                          ["result"])
+LINKS_FAILED = Counter("wa_links_failed_total", "Link sessions that did not link, by reason", ["reason"])
+CODE_DETECTION_SECONDS = Histogram("wa_code_detection_seconds", "Time from code search start to linking code found")
+LOGIN_CONFIRMATION_SECONDS = Histogram("wa_login_confirmation_seconds",
+                                       "Time from code entry to login confirmed", ["via"])
+HIERARCHY_DUMP_SECONDS = Histogram("wa_hierarchy_dump_seconds", "uiautomator2 dump_hierarchy latency",
+                                   buckets=(0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10))
+BROWSER_LAUNCH_SECONDS = Histogram("wa_browser_launch_seconds", "Chromium launch time", ["mode"])
+BROWSER_RSS_MEGABYTES = Histogram("wa_browser_rss_megabytes", "Browser process-tree RSS per session phase",
+                                  ["phase", "launch_profile"], buckets=(100, 200, 300, 400, 500, 750, 1000, 1500, 2000))
+ACTIVE_SESSIONS = Gauge("wa_active_sessions", "Link sessions currently open")
+RETRIES = Counter("wa_retries_total", "Retries performed by the retry engine", ["op"])
+CIRCUIT_OPEN = Gauge("wa_circuit_open", "1 while the circuit breaker for a device / web target is open", ["target"])
+LIVE_BROWSERS = Gauge("wa_live_browsers", "Chromium instances launched and not yet closed")
+
+
+# =================================================
+# EXPORTERS
+# =================================================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def write_textfile(path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(render())
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️ Could not write metrics textfile: {e}")
+
+
+_EXPORTER_STARTED = False
+
+
+def start_metrics_exporter():
+    """WA_METRICS_PORT / WA_METRICS_TEXTFILE ke hisaab se exporter start (ek hi baar)."""
+    global _EXPORTER_STARTED
+    if _EXPORTER_STARTED:
+        return
+    _EXPORTER_STARTED = True
+
+    port = os.environ.get("WA_METRICS_PORT")
+    if port:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", int(port)), _MetricsHandler)
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"📈 Metrics on http://127.0.0.1:{port}/metrics")
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Metrics endpoint not started: {e}")
+
+    path = os.environ.get("WA_METRICS_TEXTFILE")
+    if path:
+        def loop():
+            while True:
+                write_textfile(path)
+                time.sleep(TEXTFILE_INTERVAL)
+
+        threading.Thread(target=loop, name="metrics-textfile", daemon=True).start()
+        atexit.register(write_textfile, path)
+        print(f"📈 Metrics textfile: {path}")
@@ -0,0 +1,126 @@
+import importlib.util
+import io
+import re
+import time
+
+# PIL/pytesseract pehli OCR call pe hi load hote hain (import-time sasta rahe)
+OCR_AVAILABLE = all(importlib.util.find_spec(m) is not None for m in ("PIL", "pytesseract"))
+_OCR_MODULES = None
+
+
+def _ocr_modules():
+    """Lazy (Image, pytesseract) import; fail hone par OCR band."""
+    global _OCR_MODULES, OCR_AVAILABLE
+    if _OCR_MODULES is None and OCR_AVAILABLE:
+        try:
+            from PIL import Image
+            import pytesseract
+            _OCR_MODULES = (Image, pytesseract)
+        except Exception:
+            OCR_AVAILABLE = False
+    return _OCR_MODULES
+
+# =================================================
+# OCR FALLBACK FOR LINKING CODE (XXXX-XXXX)
+# =================================================
+# DOM text se code na mile to code region ka screenshot leke OCR karta hai.
+# Region ek baar milne ke baad yaad rakha jata hai (session me aur
+# selector cache me per-locale), taaki agli calls sirf chhota crop padhein.
+CODE_SHAPE_RE = re.compile(r"^([A-Z0-9]{4})-?([A-Z0-9]{4})$")
+OCR_CONFIG = "--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-"
+OCR_MAX_WIDTH = 600
+OCR_THRESHOLD = 140
+
+# Visible, code-jaise chhote containers ka union rect (viewport coordinates)
+_REGION_JS = """
+(selectors) => {
+  const rects = [];
+  for (const sel of selectors) {
+    let els;
+    try { els = document.querySelectorAll(sel); } catch (e) { continue; }
+    for (const el of els) {
+      const r = el.getBoundingClientRect();
+      if (r.width > 0 && r.height > 0 && r.height < window.innerHeight / 3) rects.push(r);
+    }
+    if (rects.length) break;
+  }
+  if (!rects.length) return null;
+  const x = Math.min(...rects.map(r => r.left)), y = Math.min(...rects.map(r => r.top));
+  const x2 = Math.max(...rects.map(r => r.right)), y2 = Math.max(...rects.map(r => r.bottom));
+  return [x, y, x2 - x, y2 - y];
+}
+"""
+
+
+def normalize_code(raw):
+    """OCR output ko XXXX-XXXX me validate karta hai, warna None."""
+    text = re.sub(r"[\s–—_]+", "", (raw or "").upper())
+    m = CODE_SHAPE_RE.match(text)
+    return f"{m.group(1)}-{m.group(2)}" if m else None
+
+
+class CodeOcr:
+    """Cropped-region OCR for the WhatsApp Web linking code."""
+
+    def __init__(self, selectors, cache=None, scope=None, pad=8):
+        self.selectors = list(selectors)
+        self.cache = cache
+        self.scope = scope
+        self.pad = pad
+        self.region = None
+        self.last_ms = 0.0
+        if cache is not None and scope:
+            learned = cache.get(scope, "ocr_code_region")
+            if learned and isinstance(learned.get("value"), list):
+                self.region = learned["value"]
+
+    def _locate_region(self, page):
+        rect = page.evaluate(_REGION_JS, self.selectors)
+        if rect:
+            x, y, w, h = rect
+            return [max(0, x - self.pad), max(0, y - self.pad), w + 2 * self.pad, h + 2 * self.pad]
+        # No container found - the linking dialog sits in the middle of the viewport
+        vp = page.viewport_size or {"width": 1280, "height": 720}
+        return [vp["width"] * 0.25, vp["height"] * 0.3, vp["width"] * 0.5, vp["height"] * 0.4]
+
+    @staticmethod
+    def _prepare(png, Image):
+        """Grayscale, downsize aur binarize (tesseract ke liye fast + clean)."""
+        img = Image.open(io.BytesIO(png)).convert("L")
+        if img.width > OCR_MAX_WIDTH:
+            ratio = OCR_MAX_WIDTH / img.width
+            img = img.resize((OCR_MAX_WIDTH, max(1, int(img.height * ratio))))
+        return img.point(lambda p: 255 if p > OCR_THRESHOLD else 0)
+
+    def read_code(self, page):
+        """Ek OCR attempt. Returns validated code ya None; latency print hoti hai."""
+        modules = _ocr_modules()
+        if modules is None:
+            return None
+        Image, pytesseract = modules
+        t0 = time.time()
+        region = self.region or self._locate_region(page)
+        x, y, w, h = region
+        png = page.screenshot(clip={"x": x, "y": y, "width": w, "height": h})
+        t_shot = time.time()
+        text = pytesseract.image_to_string(self._prepare(png, Image), config=OCR_CONFIG)
+        t_ocr = time.time()
+
+        code = None
+        for line in text.splitlines():
+            code = normalize_code(line)
+            if code:
+                break
+
+        self.last_ms = (t_ocr - t0) * 1000
+        print(f"  🔤 OCR {self.last_ms:.0f}ms (screenshot {(t_shot - t0) * 1000:.0f}ms, "
+              f"recognize {(t_ocr - t_shot) * 1000:.0f}ms){' -> ' + code if code else ''}")
+
+        if code:
+            if self.region != region:
+                self.region = region
+                if self.cache is not None and self.scope:
+                    self.cache.record(self.scope, "ocr_code_region", "clip", region)
+        else:
+            self.region = None  # re-locate next time (dialog may have moved)
+        return code
@@ -0,0 +1,250 @@
+import csv
+import os
+import re
+import sqlite3
+
+# =================================================
+# PHONE LISTS: STREAMING LOAD, E.164, DEDUPE, ON-DISK INDEX
+# =================================================
+# phones.txt (ek number per line, extra text chalega) ya phones.csv
+# (columns: number, profile, instance - header optional) line-by-line padhe
+# jate hain. Har valid number E.164 (+<cc><number>) me normalize hota hai,
+# duplicates skip hote hain, aur result <file>.idx (sqlite) me save hota hai.
+# File badle (size/mtime) tabhi re-index hota hai; pick / find / resume O(1).
+DEFAULT_PHONE_FILES = ("phones.txt", "phones.csv")
+INDEX_SUFFIX = ".idx"
+
+# ITU-T E.164 country calling codes
+COUNTRY_CODES = frozenset("""
+1 7 20 27 30 31 32 33 34 36 39 40 41 43 44 45 46 47 48 49 51 52 53 54 55 56 57 58
+60 61 62 63 64 65 66 81 82 84 86 90 91 92 93 94 95 98
+211 212 213 216 218 220 221 222 223 224 225 226 227 228 229 230 231 232 233 234 235
+236 237 238 239 240 241 242 243 244 245 246 247 248 249 250 251 252 253 254 255 256
+257 258 260 261 262 263 264 265 266 267 268 269 290 291 297 298 299
+350 351 352 353 354 355 356 357 358 359 370 371 372 373 374 375 376 377 378 379 380
+381 382 383 385 386 387 389 420 421 423
+500 501 502 503 504 505 506 507 508 509 590 591 592 593 594 595 596 597 598 599
+670 672 673 674 675 676 677 678 679 680 681 682 683 685 686 687 688 689 690 691 692
+850 852 853 855 856 880 886
+960 961 962 963 964 965 966 967 968 970 971 972 973 974 975 976 977 992 993 994 995
+996 998
+""".split())
+
+_NUMBER_RE = re.compile(r"[+\d][\d\s\-().]{5,}")
+
+
+def default_country_code():
+    """WA_DEFAULT_COUNTRY_CODE (e.g. 91) - bina country code wale national numbers ke liye."""
+    return (os.environ.get("WA_DEFAULT_COUNTRY_CODE") or "").strip().lstrip("+") or None
+
+
+def country_code_of(digits):
+    """Valid calling-code prefix (1-3 digits) ya None.
+
+    E.164 codes prefix-free hain (1 hai to 1x koi code nahi), isliye pehla
+    (shortest) match hi sahi code hai.
+    """
+    for n in (1, 2, 3):
+        if digits[:n] in COUNTRY_CODES:
+            return digits[:n]
+    return None
+
+
+def normalize_e164(raw, default_cc=None):
+    """Free-form number -> "+<cc><subscriber>" ya None (invalid / unknown country code).
+
+    "+91 98765-43210", "0091...", "919876543210" sab chalega; 10-digit national
+    number tabhi accept hota hai jab default_cc (ya WA_DEFAULT_COUNTRY_CODE) set ho.
+    """
+    if not raw:
+        return None
+    m = _NUMBER_RE.search(str(raw))
+    if not m:
+        return None
+    text = m.group().strip()
+    digits = re.sub(r"\D", "", text)
+    if text.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    else:
+        cc = default_cc or default_country_code()
+        if digits.startswith("0") or len(digits) <= 10:  # trunk "0" wala bhi national hai
+            if not cc:
+                return None  # national number, country unknown
+            digits = cc + digits.lstrip("0")
+
+    cc = country_code_of(digits)
+    if not cc or not 8 <= len(digits) <= 15 or len(digits) - len(cc) < 4:
+        return None
+    return "+" + digits
+
+
+# =================================================
+# STREAMING READERS
+# =================================================
+def _looks_like_header(row):
+    return any(cell.strip().lower() in ("number", "phone", "phone_number", "mobile") for cell in row)
+
+
+def iter_phone_records(path, default_cc=None):
+    """Yields {"number", "profile", "instance", "line"}; invalid aur duplicate numbers skip.
+
+    File line-by-line padhi jati hai (poori memory me load nahi hoti); skip
+    counts end me print hote hain.
+    """
+    seen = set()
+    skipped_invalid = skipped_dupe = 0
+    is_csv = path.lower().endswith(".csv")
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if is_csv:
+            reader = csv.reader(f)
+            columns = {"number": 0, "profile": 1, "instance": 2}
+
+            def cell(row, key):
+                i = columns[key]
+                return row[i].strip() if i is not None and i < len(row) else ""
+
+            for row in reader:
+                if not row:
+                    continue
+                if reader.line_num == 1 and _looks_like_header(row):
+                    names = [c.strip().lower() for c in row]
+                    for key, aliases in (("number", ("number", "phone", "phone_number", "mobile")),
+                                         ("profile", ("profile", "profile_code")),
+                                         ("instance", ("instance",))):
+                        columns[key] = next((names.index(a) for a in aliases if a in names), None)
+                    continue
+                number = normalize_e164(cell(row, "number"), default_cc)
+                if not number:
+                    skipped_invalid += 1
+                    continue
+                if number in seen:
+                    skipped_dupe += 1
+                    continue
+                seen.add(number)
+                instance = cell(row, "instance")
+                yield {"number": number, "profile": cell(row, "profile") or None,
+                       "instance": int(instance) if instance.isdigit() else None,
+                       "line": reader.line_num}
+        else:
+            for n, line in enumerate(f, start=1):
+                if not line.strip() or line.lstrip().startswith("#"):
+                    continue
+                number = normalize_e164(line, default_cc)
+                if not number:
+                    skipped_invalid += 1
+                    continue
+                if number in seen:
+                    skipped_dupe += 1
+                    continue
+                seen.add(number)
+                yield {"number": number, "profile": None, "instance": None, "line": n}
+
+    if skipped_invalid or skipped_dupe:
+        print(f"⚠️ {path}: skipped {skipped_invalid} invalid and {skipped_dupe} duplicate number(s)")
+
+
+# =================================================
+# ON-DISK INDEX
+# =================================================
+class PhoneIndex:
+    """sqlite index over a phone file: position / number lookup aur resume cursor."""
+
+    def __init__(self, source, index_path=None):
+        self.source = source
+        self.index_path = index_path or source + INDEX_SUFFIX
+        self.db = sqlite3.connect(self.index_path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if self._stale():
+            self.rebuild()
+
+    def _signature(self):
+        st = os.stat(self.source)
+        return f"{st.st_size}:{int(st.st_mtime)}:{default_country_code() or ''}"
+
+    def _meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _stale(self):
+        return self._meta("signature") != self._signature()
+
+    def rebuild(self):
+        """File se index dobara banata hai; pehle use ho chuke numbers used hi rehte hain."""
+        print(f"🗂️ Indexing {self.source}...")
+        with self.db:
+            try:
+                used = [r[0] for r in self.db.execute("SELECT number FROM phones WHERE used = 1")]
+            except sqlite3.OperationalError:
+                used = []  # pehli baar - table hi nahi
+            self.db.execute("DROP TABLE IF EXISTS phones")
+            self.db.execute("CREATE TABLE phones (pos INTEGER PRIMARY KEY, number TEXT UNIQUE, "
+                            "profile TEXT, instance INTEGER, used INTEGER DEFAULT 0)")
+            batch = []
+            for pos, rec in enumerate(iter_phone_records(self.source), start=1):
+                batch.append((pos, rec["number"], rec["profile"], rec["instance"]))
+                if len(batch) >= 5000:
+                    self.db.executemany("INSERT INTO phones (pos, number, profile, instance) VALUES (?, ?, ?, ?)", batch)
+                    batch = []
+            if batch:
+                self.db.executemany("INSERT INTO phones (pos, number, profile, instance) VALUES (?, ?, ?, ?)", batch)
+            # File me number add / edit hone se resume cursor #1 pe na laute (linked numbers reuse na hon)
+            self.db.executemany("UPDATE phones SET used = 1 WHERE number = ?", [(n,) for n in used])
+            self._set_meta("signature", self._signature())
+        print(f"✅ Indexed {self.count()} number(s) -> {self.index_path}")
+
+    @staticmethod
+    def _record(row):
+        if not row:
+            return None
+        pos, number, profile, instance, used = row
+        return {"pos": pos, "number": number, "profile": profile, "instance": instance, "used": bool(used)}
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM phones").fetchone()[0]
+
+    def get(self, pos):
+        """1-based position (list order) se record."""
+        return self._record(self.db.execute("SELECT * FROM phones WHERE pos = ?", (pos,)).fetchone())
+
+    def find(self, number):
+        number = normalize_e164(number) or number
+        return self._record(self.db.execute("SELECT * FROM phones WHERE number = ?", (number,)).fetchone())
+
+    def head(self, n=20):
+        return [self._record(r) for r in self.db.execute("SELECT * FROM phones ORDER BY pos LIMIT ?", (n,))]
+
+    def next_unused(self):
+        """Resume: pehla number jo abhi tak use nahi hua."""
+        return self._record(self.db.execute("SELECT * FROM phones WHERE used = 0 ORDER BY pos LIMIT 1").fetchone())
+
+    def mark_used(self, number):
+        with self.db:
+            self.db.execute("UPDATE phones SET used = 1 WHERE number = ?", (number,))
+
+    def close(self):
+        self.db.close()
+
+
+def find_phone_file(candidates=DEFAULT_PHONE_FILES):
+    for p in candidates:
+        if os.path.exists(p):
+            return p
+    return None
+
+
+def open_phone_index(path=None):
+    """Given file (ya phones.txt / phones.csv) ka PhoneIndex, ya None."""
+    path = path or find_phone_file()
+    if not path:
+        return None
+    try:
+        return PhoneIndex(path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️ Could not index {path}: {e}")
+        return None
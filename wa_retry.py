@@ -0,0 +1,158 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+from wa_metrics import CIRCUIT_OPEN, RETRIES
+
+# =================================================
+# RETRY ENGINE + CIRCUIT BREAKERS
+# =================================================
+# Retries ek jagah se: exponential backoff + jitter (sab workers ek saath
+# retry na karein). Circuit breaker per target (device serial / web host):
+# lagatar WA_BREAKER_THRESHOLD (3) failures pe "open" - us target pe kaam
+# turant skip / reroute; WA_BREAKER_COOLDOWN (120s) baad ek trial (half-open),
+# success pe phir closed.
+DEFAULT_THRESHOLD = 3
+DEFAULT_COOLDOWN = 120
+
+
+class RetryPolicy:
+    """attempts = total tries; delay n = d/2 + random(0, d/2), d = min(cap, base * 2^n)."""
+
+    def __init__(self, attempts=3, base=1.0, cap=15.0):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt):
+        d = min(self.cap, self.base * (2 ** attempt))
+        return d / 2 + random.uniform(0, d / 2)
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, breaker):
+        super().__init__(f"{breaker.key} circuit open (retry in {breaker.retry_in():.0f}s)")
+        self.breaker = breaker
+
+
+class CircuitBreaker:
+    def __init__(self, key, threshold=None, cooldown=None):
+        self.key = key
+        self.threshold = threshold or int(os.environ.get("WA_BREAKER_THRESHOLD") or DEFAULT_THRESHOLD)
+        self.cooldown = cooldown or float(os.environ.get("WA_BREAKER_COOLDOWN") or DEFAULT_COOLDOWN)
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_at = 0.0
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        return max(0.0, self.opened_at + self.cooldown - time.time()) if self.state == "open" else 0.0
+
+    def is_open(self):
+        """Read-only check (state nahi badalta) - routing decisions ke liye."""
+        return self.state == "open" and self.retry_in() > 0
+
+    def allow(self):
+        """Kaam chalana hai? Cooldown ke baad ek hi trial (half-open) jane deta hai."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self.retry_in() == 0:
+                self.state = "half_open"
+                self._trial_at = 0.0
+            # trial ka result kabhi record na ho (crash) to cooldown baad naya trial
+            if self.state == "half_open" and time.time() - self._trial_at > self.cooldown:
+                self._trial_at = time.time()
+                print(f"🔌 {self.key}: circuit half-open, trying once")
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            if self.state != "closed":
+                print(f"🔌 {self.key}: circuit closed")
+            self.state = "closed"
+            self.failures = 0
+        CIRCUIT_OPEN.set(0, target=self.key)
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                self.state = "open"
+                self.opened_at = time.time()
+                print(f"🔌 {self.key}: circuit OPEN after {self.failures} failure(s), "
+                      f"skipping for {self.cooldown:.0f}s")
+                CIRCUIT_OPEN.set(1, target=self.key)
+
+    def snapshot(self):
+        return {"key": self.key, "state": self.state, "failures": self.failures,
+                "retry_in": round(self.retry_in(), 1)}
+
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(key):
+    with _BREAKERS_LOCK:
+        if key not in _BREAKERS:
+            _BREAKERS[key] = CircuitBreaker(key)
+        return _BREAKERS[key]
+
+
+def device_breaker(serial):
+    return get_breaker(f"device:{serial or 'default'}")
+
+
+def web_breaker(url):
+    return get_breaker(f"web:{urlparse(url).netloc or url}")
+
+
+def breakers():
+    with _BREAKERS_LOCK:
+        return [b.snapshot() for b in _BREAKERS.values()]
+
+
+def retry(fn, policy=None, label="operation", retry_on=(Exception,), accept=None, breaker=None,
+          on_retry=None):
+    """fn() ko policy ke hisaab se retry karta hai.
+
+    `accept(result)` False ho to bhi failure (e.g. wait_* jo False lautate hain);
+    aakhri attempt ka aisa result waise hi return hota hai, exception re-raise.
+    `breaker` pehle check hota hai (open = CircuitOpenError); poori call ka
+    outcome (saare attempts ke baad) ek success/failure gina jata hai.
+    `on_retry(attempt)` har retry se pehle (e.g. app relaunch).
+    """
+    policy = policy or RetryPolicy()
+    if breaker is not None and not breaker.allow():
+        raise CircuitOpenError(breaker)
+    for attempt in range(policy.attempts):
+        last = attempt == policy.attempts - 1
+        try:
+            result = fn()
+        except retry_on as e:
+            if last:
+                if breaker is not None:
+                    breaker.failure()
+                raise
+            reason = e
+        else:
+            if accept is None or accept(result):
+                if breaker is not None:
+                    breaker.success()
+                return result
+            if last:
+                if breaker is not None:
+                    breaker.failure()
+                return result
+            reason = f"got {result!r}"
+        delay = policy.delay(attempt)
+        RETRIES.inc(op=label)
+        print(f"🔁 {label} failed (attempt {attempt + 1}/{policy.attempts}): {reason} - retrying in {delay:.1f}s")
+        time.sleep(delay)
+        if on_retry is not None:
+            on_retry(attempt + 1)
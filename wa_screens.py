@@ -0,0 +1,217 @@
+import time
+from collections import deque
+
+from wa_android import (
+    LINK_FLOW_BY_STEP,
+    LINK_FLOW_STEPS,
+    detect_buttons,
+    focused_window,
+    forget_linked_devices,
+    handle_app_chooser,
+    is_chooser_window,
+    linked_devices_baseline,
+    open_whatsapp,
+    resumed_activity,
+    run_link_step,
+    selector_scope,
+)
+from wa_selector_cache import get_selector_cache
+
+# =================================================
+# SCREEN CLASSIFIER + SHORTEST-PATH NAVIGATOR
+# =================================================
+# Ek snapshot (hierarchy dump + focused window) se current screen pehchano,
+# phir code-entry screen tak ka shortest path chalo. Har action ke baad
+# dobara classify hota hai, taaki unexpected screen pe plan badal sake.
+# Jo phone pehle se flow me (ya uske paas) hai, use restart nahi kiya jata.
+SCREEN_LOCK = "lock_screen"
+SCREEN_CHOOSER = "chooser"
+SCREEN_HOME = "home"                    # launcher / koi aur app / dusre user ka WhatsApp
+SCREEN_CHATS = "chats"
+SCREEN_MENU = "overflow_menu"
+SCREEN_LINKED_DEVICES = "linked_devices"
+SCREEN_QR_SCANNER = "qr_scanner"
+SCREEN_PHONE_CODE = "phone_code_entry"
+SCREEN_WHATSAPP_OTHER = "whatsapp_other"  # WhatsApp ke andar koi aur screen (chat, settings...)
+IN_APP_SCREENS = (SCREEN_CHATS, SCREEN_MENU, SCREEN_LINKED_DEVICES, SCREEN_QR_SCANNER, SCREEN_PHONE_CODE)
+
+# screen -> [(action, expected next screen)]; link steps LINK_FLOW_STEPS ke naam hain
+TRANSITIONS = {
+    SCREEN_LOCK: [("unlock", SCREEN_HOME)],
+    SCREEN_CHOOSER: [("choose", SCREEN_CHATS)],
+    SCREEN_HOME: [("launch", SCREEN_CHATS)],
+    SCREEN_WHATSAPP_OTHER: [("back", SCREEN_CHATS), ("restart", SCREEN_CHATS)],
+    SCREEN_CHATS: [("menu", SCREEN_MENU)],
+    SCREEN_MENU: [("linked_devices", SCREEN_LINKED_DEVICES)],
+    SCREEN_LINKED_DEVICES: [("link_device", SCREEN_QR_SCANNER)],
+    SCREEN_QR_SCANNER: [("link_with_phone", SCREEN_PHONE_CODE)],
+    SCREEN_PHONE_CODE: [],
+}
+
+# Learned ids jinse screen pehchani ja sakti hai (step -> screen jahan woh dikhta hai)
+_STEP_SCREENS = {
+    "link_with_phone": SCREEN_QR_SCANNER,
+    "link_device": SCREEN_LINKED_DEVICES,
+    "linked_devices": SCREEN_MENU,
+    "menu": SCREEN_CHATS,
+}
+
+
+def _learned_ids(device, package, cache):
+    scope = selector_scope(device, package)
+    ids = {}
+    for step in _STEP_SCREENS:
+        entry = cache.get(scope, step)
+        if entry and entry.get("kind") == "res":
+            ids[step] = entry["value"]
+    return ids
+
+
+def classify_screen(device, package, user_id=None, cache=None):
+    """Ek snapshot se current screen. Returns (screen, buttons)."""
+    cache = cache or get_selector_cache()
+    window = focused_window(device)
+    buttons = detect_buttons(device)
+
+    if any("keyguard" in b["res"] for b in buttons) or \
+       (window and window[0] == "com.android.systemui" and "keyguard" in window[1].lower()):
+        return SCREEN_LOCK, buttons
+    if window and is_chooser_window(window) and \
+       any("whatsapp" in b["text"] for b in buttons if b["pkg"] != package):
+        return SCREEN_CHOOSER, buttons
+
+    wa = [b for b in buttons if b["pkg"] == package]
+    if not wa:
+        return SCREEN_HOME, buttons
+    if window and window[0] == package and user_id is not None and window[2] not in (None, user_id):
+        return SCREEN_HOME, buttons  # same package, different user (dual)
+    if user_id not in (None, 0) and (not window or window[2] is None):
+        # Window se user pata nahi (hierarchy me user nahi hota) - clone/work profile
+        # ke liye resumed activity se confirm karo, warna main user ka WhatsApp chala denge
+        resumed = resumed_activity(device)
+        if resumed and resumed != (package, user_id):
+            return SCREEN_HOME, buttons
+
+    texts = {b["text"] for b in wa}
+    ress = {b["res_raw"] for b in wa}
+    learned = _learned_ids(device, package, cache)
+
+    if any("edittext" in b["class"].lower() for b in wa) and any("code" in t for t in texts):
+        return SCREEN_PHONE_CODE, buttons
+    if any("link with phone" in t for t in texts) or learned.get("link_with_phone") in ress:
+        return SCREEN_QR_SCANNER, buttons
+    if "link a device" in texts or learned.get("link_device") in ress or \
+       any("link_device" in b["res"] for b in wa):
+        return SCREEN_LINKED_DEVICES, buttons
+    if "linked devices" in texts and "settings" in texts:
+        return SCREEN_MENU, buttons
+    if any("menuitem_overflow" in b["res"] or "new chat" in b["text"] or b["text"] == "chats" for b in wa) or \
+       learned.get("menu") in ress:
+        return SCREEN_CHATS, buttons
+    return SCREEN_WHATSAPP_OTHER, buttons
+
+
+def plan_path(screen, target=SCREEN_PHONE_CODE):
+    """BFS over TRANSITIONS. Returns list of actions (empty = already there), None = no path."""
+    queue = deque([(screen, [])])
+    seen = {screen}
+    while queue:
+        cur, path = queue.popleft()
+        if cur == target:
+            return path
+        for action, nxt in TRANSITIONS.get(cur, []):
+            if nxt not in seen:
+                seen.add(nxt)
+                queue.append((nxt, path + [action]))
+    return None
+
+
+def _perform(device, package, user_id, action, cache):
+    if action == "unlock":
+        device.screen_on()
+        device.unlock()
+        time.sleep(0.5)
+        return True
+    if action == "choose":
+        return handle_app_chooser(device, package, user_id, timeout=2, cache=cache)
+    if action in ("launch", "restart"):
+        return open_whatsapp(device, package, user_id)
+    if action == "back":
+        device.press("back")
+        time.sleep(0.6)
+        return True
+    if action in LINK_FLOW_BY_STEP:
+        names = [s[0] for s in LINK_FLOW_STEPS]
+        i = names.index(action)
+        next_step = names[i + 1] if i + 1 < len(names) else None
+        return run_link_step(device, package, action, next_step, cache=cache, user_id=user_id) is not None
+    raise ValueError(f"unknown action {action}")
+
+
+def ensure_whatsapp(device, package, user_id, cache=None, warm=None):
+    """WhatsApp pehle se link flow me (ya chats pe) ho to restart nahi; warna open_whatsapp.
+
+    Returns True/False (WhatsApp ready).
+    """
+    screen, _ = classify_screen(device, package, user_id, cache=cache)
+    if screen in IN_APP_SCREENS:
+        print(f"♻️ WhatsApp already on {screen}, not restarting")
+        return True
+    return open_whatsapp(device, package, user_id, warm=warm)
+
+
+def stuck_message(screen):
+    """reach_phone_code_screen ke result (stuck screen) se user-facing error."""
+    return f"Code entry screen not reached (stuck on {screen})"
+
+
+def reach_phone_code_screen(device, package, user_id, cache=None, max_actions=12):
+    """Jahan bhi device hai wahan se code-entry screen tak shortest path.
+
+    Returns None on success, warna us screen ka naam jahan atak gaya (caller
+    `stuck_message` se error bana ke SystemExit / retry decide kare).
+    """
+    cache = cache or get_selector_cache()
+    backs = 0
+    stale = 0
+    navigated = False
+    counted_back = False
+    screen = None
+    forget_linked_devices(device, package, user_id)
+    for _ in range(max_actions):
+        screen, _ = classify_screen(device, package, user_id, cache=cache)
+        path = plan_path(screen)
+        if screen == SCREEN_QR_SCANNER and not counted_back and \
+           linked_devices_baseline(device, package, user_id) is None:
+            # QR screen se shuru: linked devices gine nahi gaye - ek back (Linked devices),
+            # "link_device" step baseline record karega, warna phone-side confirmation nahi hoga
+            counted_back = True
+            print(f"🧭 {screen} -> back (count linked devices before code entry)")
+            _perform(device, package, user_id, "back", cache)
+            continue
+        if path == [] and not navigated:
+            # Pichle run ki code screen (purana/expired input) - us pe code mat daalo;
+            # back karke "Link with phone number" se fresh screen kholo, na ho to restart
+            stale += 1
+            path = ["back"] if stale == 1 else ["restart"]
+            print(f"🧭 {screen} left over from an earlier attempt -> {path[0]}")
+            _perform(device, package, user_id, path[0], cache)
+            continue
+        if path == []:
+            print(f"🧭 On {screen}")
+            return None
+        if not path:
+            return screen
+
+        action = path[0]
+        if action == "back":
+            # Unknown WhatsApp screen: 3 backs tak try, phir restart
+            backs += 1
+            if backs > 3:
+                action = "restart"
+        print(f"🧭 {screen} -> {action} ({len(path)} step(s) to code entry)")
+        if not _perform(device, package, user_id, action, cache):
+            print(f"⚠️ Action {action} failed on {screen}")
+        elif action == "link_with_phone":
+            navigated = True
+    return screen or "unknown"
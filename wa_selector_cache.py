@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+
+# =================================================
+# LEARNED SELECTOR CACHE
+# =================================================
+# Har scope (web locale ya Android package+version) ke liye yaad rakhta hai
+# ki kaunsa selector / resource-id last time successful tha. Agli run me
+# wahi pehle try hota hai, baaki candidates fallback ke liye order me rehte hain.
+#
+# File format:
+# {
+#   "web:en-US":                   {"link_with_phone": {"kind": "text", "value": "Link with phone number"}},
+#   "android:com.whatsapp:2.24.1": {"menu": {"kind": "res", "value": "com.whatsapp:id/menuitem_overflow"}},
+#   "device:R58M123ABC":           {"chooser:com.whatsapp:999": {"kind": "xy", "value": [540, 1900]}}
+# }
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "selector_cache.json")
+
+
+def web_scope(locale):
+    return f"web:{(locale or 'unknown').lower()}"
+
+
+def android_scope(package, version):
+    return f"android:{package}:{version or 'unknown'}"
+
+
+def device_scope(serial):
+    """Per-phone entries (e.g. app chooser layout) jo app version pe depend nahi karte."""
+    return f"device:{serial or 'default'}"
+
+
+class SelectorCache:
+    """JSON-file backed cache of winning selectors per scope and step."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("WA_SELECTOR_CACHE") or DEFAULT_CACHE_PATH
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+                if not isinstance(self._data, dict):
+                    self._data = {}
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def _save(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️ Could not save selector cache: {e}")
+
+    def get(self, scope, step):
+        """Learned entry ({"kind", "value"}) ya None."""
+        with self._lock:
+            entry = self._load().get(scope, {}).get(step)
+        return dict(entry) if entry else None
+
+    def ordered(self, scope, step, candidates):
+        """Candidates ko learned winner first order me return karta hai."""
+        candidates = list(candidates)
+        entry = self.get(scope, step)
+        if entry and entry.get("value") in candidates:
+            candidates.remove(entry["value"])
+            candidates.insert(0, entry["value"])
+        return candidates
+
+    def record(self, scope, step, kind, value):
+        """Winner save karta hai (file sirf tab likhi jati hai jab value badle)."""
+        if not value:
+            return
+        entry = {"kind": kind, "value": value}
+        with self._lock:
+            data = self._load()
+            if data.get(scope, {}).get(step) == entry:
+                return
+            data.setdefault(scope, {})[step] = entry
+            self._save()
+
+    def forget(self, scope, step):
+        """Stale entry hatata hai (jab learned selector ab kaam na kare)."""
+        with self._lock:
+            data = self._load()
+            if data.get(scope, {}).pop(step, None) is not None:
+                self._save()
+
+
+_DEFAULT_CACHE = None
+
+
+def get_selector_cache():
+    """Process-wide default cache."""
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = SelectorCache()
+    return _DEFAULT_CACHE
@@ -0,0 +1,192 @@
+import os
+import time
+import uuid
+
+from wa_android import enter_code_on_phone
+from wa_browser import BrowserState, get_code_from_browser, hold_policy, record_rss, release_browser, session_paths
+from wa_completion import browser_grace, wait_for_link_completion
+from wa_deadlines import deadline, instance_scope, record_step
+from wa_debug import DebugArtifacts
+from wa_fleet import connect_device, find_whatsapp_instances
+from wa_log import bind, log_event, unbind
+from wa_metrics import ACTIVE_SESSIONS, LINKS_ATTEMPTED, LINKS_FAILED, LINKS_SUCCEEDED, LOGIN_CONFIRMATION_SECONDS
+from wa_screens import ensure_whatsapp, reach_phone_code_screen, stuck_message
+
+# =================================================
+# LINK SESSION (ONE PROFILE <-> ONE WHATSAPP INSTANCE)
+# =================================================
+# Device, instance, browser context/page aur timings ek object me; koi
+# module-level global nahi, isliye ek process me kai sessions chal sakte hain.
+SUCCESS_STATES = ("linked", "logged_in")
+
+
+class LinkSession:
+    """Ek profile ka link flow: start -> get_code -> enter_code -> await_login -> close.
+
+    `device` aur `playwright` bahar se diye ja sakte hain (warm pools, daemon
+    workers); na diye hon to session khud connect / start karta hai. Playwright
+    sync API thread-bound hai - ek session ke browser calls usi thread pe hon
+    jisne driver start kiya.
+    """
+
+    def __init__(self, profile, phone=None, serial=None, instance=1, device=None,
+                 package=None, user_id=None, playwright=None, debug=None, warm=None, hold=None,
+                 session_id=None):
+        self.profile = profile
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.phone = phone
+        self.serial = serial
+        self.instance = int(instance or 1)
+        self.device = device
+        self.package = package
+        self.user_id = user_id
+        self.playwright = playwright
+        self.warm = warm  # None = WA_LAUNCH_MODE
+        self.hold = hold or hold_policy()  # (policy, seconds) - close() pe browser kaise release ho
+        self.debug = debug if debug is not None else DebugArtifacts(profile, run_tag=self.session_id)
+        self.browser = BrowserState()
+        self.status = "new"
+        self.code = None
+        self.confirmed_by = None
+        self.timings = {}
+        self._t0 = None
+        self._on_link_screen = False
+        self._counted = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def page(self):
+        return self.browser.page
+
+    def _mark(self, step):
+        self.timings[step] = round(time.time() - (self._t0 or time.time()), 2)
+        if self.browser.context is not None:
+            record_rss(self.browser, step)
+
+    # ---------- lifecycle ----------
+    def start(self):
+        """Device connect (agar nahi diya), instance resolve, WhatsApp open (flow me ho to restart nahi)."""
+        self._t0 = time.time()
+        self.status = "starting"
+        # Is thread ki saari output (print bhi) is session ki log file me
+        bind(session=self.session_id, profile=self.profile, device=self.serial, instance=self.instance)
+        if not self._counted:
+            self._counted = True
+            LINKS_ATTEMPTED.inc()
+            ACTIVE_SESSIONS.inc()
+            log_event("session_start", phone=self.phone)
+        if self.device is None:
+            self.device = connect_device(self.serial)
+            self.device.screen_on()
+            self.device.unlock()
+        if self.serial is None:
+            self.serial = getattr(self.device, "serial", None)
+            bind(device=self.serial)
+        if self.package is None:
+            instances = find_whatsapp_instances(self.serial)
+            if not 1 <= self.instance <= len(instances):
+                raise ValueError(f"instance {self.instance} not available on {self.serial or 'device'}")
+            self.package, self.user_id = instances[self.instance - 1]
+        if not ensure_whatsapp(self.device, self.package, self.user_id, warm=self.warm):
+            raise RuntimeError("WhatsApp did not become ready")
+        self._mark("whatsapp_ready")
+        return self
+
+    def get_code(self, hold_open=False):
+        """WhatsApp Web se linking code. Returns code, "LOGGED_IN" ya None."""
+        profile_path, cache_path = session_paths(self.profile)
+        os.makedirs(profile_path, exist_ok=True)
+        os.makedirs(cache_path, exist_ok=True)
+        code = get_code_from_browser(profile_path, self.phone, debug=self.debug, playwright=self.playwright,
+                                     hold_open=hold_open, state=self.browser)
+        self._mark("code")
+        if code == "LOGGED_IN":
+            self.status = "logged_in"
+        elif code:
+            self.code = code
+            self.status = "code_ready"
+        else:
+            self.status = "no_code"
+        return code
+
+    def prepare_phone(self):
+        """Phone pe code-entry screen tak (shortest path). Returns None ya stuck screen ka naam."""
+        stuck = reach_phone_code_screen(self.device, self.package, self.user_id)
+        self._mark("phone_link_screen")
+        self._on_link_screen = not stuck
+        return stuck
+
+    def enter_code(self, code=None):
+        """Code phone pe enter karta hai (zarurat ho to pehle navigate)."""
+        code = code or self.code
+        if not self._on_link_screen:
+            stuck = self.prepare_phone()
+            if stuck:
+                raise RuntimeError(stuck_message(stuck))
+        ok = enter_code_on_phone(self.device, code)
+        self._mark("code_entered")
+        return ok
+
+    def await_login(self, timeout=None):
+        """Browser aur phone signals ka race. Returns "browser"/"phone"/None.
+
+        `timeout=None` = is instance ki login history se deadline (default 300s).
+        """
+        scope = instance_scope(self.device, self.package, self.user_id)
+        adaptive = timeout is None
+        if adaptive:
+            timeout = deadline("login", 300, scope)
+        t0 = time.time()
+        # grace yahan alag se - login duration (history / metrics) me na gine
+        self.confirmed_by = wait_for_link_completion(self.page, self.device, self.package, timeout=timeout,
+                                                     grace=0, user_id=self.user_id)
+        self._mark("confirmed")
+        if self.confirmed_by:
+            LOGIN_CONFIRMATION_SECONDS.observe(time.time() - t0, via=self.confirmed_by)
+            record_step("login", time.time() - t0, scope)
+        elif adaptive:
+            record_step("login", None, scope)
+        if self.confirmed_by == "phone" and self.page is not None:
+            browser_grace(self.page)
+        self.status = "linked" if self.confirmed_by else "timeout"
+        return self.confirmed_by
+
+    def close(self, hold=None):
+        """Hold policy ke hisaab se browser release (hold = is call ke liye override)."""
+        release_browser(self.browser, self.status, hold or self.hold, debug=self.debug)
+        self.debug.close()  # writes flush + worker thread band (har job ka thread leak na ho)
+        if self._record_outcome():
+            log_event("session_end", level="info" if self.status in SUCCESS_STATES else "warning",
+                      status=self.status, confirmed_by=self.confirmed_by, timings=self.timings,
+                      rss_mb=self.browser.rss)
+        unbind()
+
+    def _record_outcome(self):
+        """Ek session ka result ek hi baar count hota hai (close dobara call ho to bhi)."""
+        if not self._counted:
+            return False
+        self._counted = False
+        ACTIVE_SESSIONS.dec()
+        if self.status in SUCCESS_STATES:
+            LINKS_SUCCEEDED.inc(result=self.status)
+        elif self.status in ("no_code", "timeout"):
+            LINKS_FAILED.inc(reason=self.status)
+        else:
+            # beech me exception: jis stage pe ruka wahi reason (starting = device/WhatsApp, code_ready = phone entry)
+            LINKS_FAILED.inc(reason=f"aborted_{self.status}")
+        return True
+
+    def run(self, timeout=None):
+        """Non-interactive full flow. Returns final status (timeout=None = adaptive login deadline)."""
+        self.start()
+        code = self.get_code()
+        if code and code != "LOGGED_IN":
+            if not self.enter_code():
+                raise RuntimeError("could not enter code on phone")
+            self.await_login(timeout=timeout)
+        return self.status
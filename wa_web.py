@@ -0,0 +1,281 @@
+import os
+import re
+import time
+
+# =================================================
+# WHATSAPP WEB ELEMENT DISCOVERY (PLAYWRIGHT)
+# =================================================
+# Default: ek in-page script ek hi round trip me candidates match karta hai,
+# visibility check karta hai aur matched elements pe data-wa-discover
+# attribute laga deta hai; phir click/type sirf us attribute se hota hai.
+# WA_WEB_DISCOVERY=legacy purana per-candidate locator path chalata hai
+# (IPC counts compare karne ke liye).
+DISCOVER_ATTR = "data-wa-discover"
+
+_DISCOVER_JS = """
+(args) => {
+  const ATTR = args.attr;
+  const visible = (el) => {
+    const r = el.getBoundingClientRect();
+    const st = window.getComputedStyle(el);
+    return r.width > 0 && r.height > 0 && st.visibility !== 'hidden' && st.display !== 'none';
+  };
+  const tag = (el, name) => {
+    document.querySelectorAll(`[${ATTR}="${name}"]`).forEach(e => e.removeAttribute(ATTR));
+    el.setAttribute(ATTR, name);
+  };
+  const norm = (s) => (s || '').replace(/\\s+/g, ' ').trim();
+  const all = document.body ? Array.from(document.body.querySelectorAll('*')) : [];
+  // Deepest elements whose text matches (same idea as Playwright text engine)
+  const deepest = (match) => all.filter(el => match(el.textContent)
+      && !Array.from(el.children).some(ch => match(ch.textContent)));
+  const out = {hidden: []};
+
+  if (args.texts) {
+    for (const txt of args.texts) {
+      const needle = txt.toLowerCase();
+      const hits = deepest(t => norm(t).toLowerCase().includes(needle));
+      if (!hits.length) continue;
+      const el = hits[0];
+      el.scrollIntoView({block: 'center'});
+      if (visible(el)) {
+        tag(el, 'link');
+        out.link = {text: txt, visible: true};
+        break;
+      }
+      out.hidden.push(txt);
+    }
+  }
+
+  if (args.selectors) {
+    for (const sel of args.selectors) {
+      let els;
+      try { els = document.querySelectorAll(sel); } catch (e) { continue; }
+      if (!els.length) continue;
+      const el = els[els.length - 1];  // phone input is usually the last one
+      el.scrollIntoView({block: 'center'});
+      tag(el, 'phone-input');
+      out.input = {selector: sel, count: els.length, visible: visible(el)};
+      break;
+    }
+  }
+
+  if (args.nextText) {
+    const hits = deepest(t => norm(t) === args.nextText).filter(visible);
+    if (hits.length) {
+      tag(hits[0], 'next');
+      out.next = {visible: true};
+    }
+  }
+  return out;
+}
+"""
+
+
+def use_legacy_discovery():
+    return os.environ.get("WA_WEB_DISCOVERY", "").strip().lower() == "legacy"
+
+
+class IpcStats:
+    """Per-step count of Playwright calls that cross the driver IPC boundary."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.counts = {}
+        self.tagged = set()  # elements tagged by the last discovery calls
+
+    def add(self, step, n=1):
+        self.counts[step] = self.counts.get(step, 0) + n
+
+    def report(self):
+        if not self.counts:
+            return
+        parts = ", ".join(f"{k}={v}" for k, v in self.counts.items())
+        print(f"📊 Playwright IPC round trips ({self.mode}): {parts} (total {sum(self.counts.values())})")
+
+
+def _discovered(page, name):
+    return page.locator(f"[{DISCOVER_ATTR}='{name}']")
+
+
+def _discover(page, stats, step, **args):
+    stats.add(step)
+    args["attr"] = DISCOVER_ATTR
+    found = page.evaluate(_DISCOVER_JS, args) or {}
+    stats.tagged.update(k for k in ("link", "input", "next") if found.get(k))
+    return found
+
+
+# =================================================
+# 1. "LINK WITH PHONE NUMBER"
+# =================================================
+def click_link_with_phone(page, candidates, stats, legacy=False):
+    """Pehla visible candidate text click karta hai. Returns matched text ya None."""
+    if legacy:
+        return _click_link_with_phone_legacy(page, candidates, stats)
+
+    found = _discover(page, stats, "link", texts=list(candidates))
+    for txt in found.get("hidden", []):
+        print(f"  ℹ️ Element found but not visible: {txt}")
+    link = found.get("link")
+    if not link:
+        return None
+    stats.add("link")
+    try:
+        _discovered(page, "link").first.click(timeout=2000)
+    except Exception:
+        # Tagged node re-render / hide ho gaya - 30s default wait ki jagah locator chain
+        print("  ↩️ Discovered link not clickable, falling back to locators")
+        return _click_link_with_phone_legacy(page, candidates, stats)
+    print(f"✅ Clicked by text: {link['text']}")
+    time.sleep(2)  # Wait for page change after click
+    return link["text"]
+
+
+def _click_link_with_phone_legacy(page, candidates, stats):
+    for txt in candidates:
+        try:
+            locator = page.get_by_text(txt, exact=False)
+            stats.add("link")
+            if locator.count() > 0:
+                el = locator.first
+                # Ensure element is visible and scroll into view
+                stats.add("link")
+                el.scroll_into_view_if_needed()
+                time.sleep(0.3)
+
+                # Check if visible before clicking
+                stats.add("link")
+                if el.is_visible():
+                    stats.add("link")
+                    el.click()
+                    print(f"✅ Clicked by text: {txt}")
+                    time.sleep(2)  # Wait for page change after click
+                    return txt
+                else:
+                    print(f"  ℹ️ Element found but not visible: {txt}")
+        except Exception:
+            pass
+    return None
+
+
+# =================================================
+# 2. PHONE INPUT (+ NEXT BUTTON)
+# =================================================
+def find_phone_input(page, selectors, stats, legacy=False):
+    """Phone number input dhoondhta hai. Returns (locator, selector) ya (None, None).
+
+    JS path me "Next" button bhi isi round trip me tag ho jata hai.
+    """
+    if legacy:
+        return _find_phone_input_legacy(page, selectors, stats)
+
+    found = _discover(page, stats, "phone_input", selectors=list(selectors), nextText="Next")
+    info = found.get("input")
+    if not info:
+        return None, None
+    print(f"Found {info['count']} elements with {info['selector']}")
+    locator = _discovered(page, "phone-input").first
+    stats.add("phone_input")
+    try:
+        locator.wait_for(state="visible", timeout=2000)
+    except Exception:
+        # Stale / hidden node pe caller ke click ko 30s default block na karna pade
+        print("  ↩️ Discovered input not usable, falling back to locators")
+        return _find_phone_input_legacy(page, selectors, stats)
+    return locator, info["selector"]
+
+
+def _find_phone_input_legacy(page, selectors, stats):
+    for sel in selectors:
+        try:
+            loc = page.locator(sel)
+            stats.add("phone_input")
+            if loc.count() > 0:
+                stats.add("phone_input", 2)
+                inputs_found = loc.all()
+                print(f"Found {loc.count()} elements with {sel}")
+                return inputs_found[-1], sel  # Use the last input field found
+        except Exception:
+            pass
+    return None, None
+
+
+def click_next(page, stats, legacy=False):
+    """'Next' click karta hai (tagged element, warna text/role locators)."""
+    if not legacy and "next" in stats.tagged:
+        stats.add("next")
+        try:
+            _discovered(page, "next").first.click(timeout=2000)
+            print("✅ Clicked 'Next'")
+            time.sleep(3)  # Wait for code to generate
+            return True
+        except Exception:
+            pass  # Not tagged / re-rendered - fall back to locators below
+
+    next_btn = page.get_by_text("Next", exact=True)
+    stats.add("next")
+    if next_btn.count() > 0:
+        next_el = next_btn.first
+        stats.add("next", 2)
+        next_el.scroll_into_view_if_needed()
+        time.sleep(0.3)
+        if next_el.is_visible():
+            stats.add("next")
+            next_el.click()
+            print("✅ Clicked 'Next'")
+            time.sleep(3)  # Wait for code to generate
+            return True
+    else:
+        # Try finding button by role
+        next_role = page.get_by_role("button", name="Next")
+        stats.add("next")
+        if next_role.count() > 0:
+            stats.add("next")
+            next_role.first.click()
+            print("✅ Clicked 'Next' (by role)")
+            time.sleep(3)
+            return True
+    return False
+
+
+# =================================================
+# 3. FALLBACK CODE-SELECTOR SCAN (BATCHED)
+# =================================================
+CODE_SELECTORS = [
+    "[data-testid*='code']",
+    "[class*='code']",
+    "[class*='linking']",
+    "span[class*='bold']",
+]
+
+_CODE_LOOKS_RE = re.compile(r"[A-Z0-9]{4}[-\s][A-Z0-9]{4}")
+
+# Saare selectors ke texts ek hi evaluate me; browser side pe sirf code-jaise
+# texts wapas aate hain taaki payload chhota rahe.
+_SCAN_CODE_JS = """
+(selectors) => {
+  const looks = /[A-Z0-9]{4}[-\\s][A-Z0-9]{4}/;
+  const out = [];
+  for (const sel of selectors) {
+    let els;
+    try { els = document.querySelectorAll(sel); } catch (e) { continue; }
+    for (const el of els) {
+      const text = (el.textContent || '').trim();
+      if (looks.test(text)) out.push([sel, text]);
+    }
+  }
+  return out;
+}
+"""
+
+
+def find_code_in_selectors(page, selectors=CODE_SELECTORS):
+    """Code containers scan karta hai. Returns (selector, code) ya (None, None)."""
+    for selector, el_text in page.evaluate(_SCAN_CODE_JS, list(selectors)) or []:
+        # Check if text looks like a code
+        if _CODE_LOOKS_RE.search(el_text):
+            code = re.sub(r"[\s\n]+", "", el_text)
+            if len(code) >= 7:  # At least XXXXYYYY
+                return selector, code
+    return None, None